@@ -0,0 +1,60 @@
+"""Banded 1-D DTW used by the contour similarities in features.py."""
+from __future__ import annotations
+
+import numpy as np
+from numba import njit, prange
+
+# Finite stand-in for +inf outside the band (fastmath assumes no infs).
+_BIG = 1e30
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def dtw_band(a: np.ndarray, b: np.ndarray, radius: int) -> float:
+    """Accumulated cost of the best warp between 1-D series a and b.
+
+    Local cost is |a[i] - b[j]| with librosa's default steps (1,1), (0,1),
+    (1,0). Only cells within `radius` of the diagonal are visited
+    (Sakoe-Chiba band) and only two rows are kept, so there is no cost
+    matrix and no warping path; local costs are computed inline, per cell
+    in the band, rather than as a precomputed cdist matrix. Runs without the
+    GIL, so threads can score candidates in parallel.
+    """
+    n = a.shape[0]
+    m = b.shape[0]
+    prev = np.full(m, _BIG)
+    cur = np.full(m, _BIG)
+    for i in range(n):
+        c = (i * m) // n
+        lo = max(0, c - radius)
+        hi = min(m, c + radius + 1)
+        if i == n - 1:
+            hi = m  # the band must reach the end cell
+        # Bands only move right, so cells past the previous band are still _BIG;
+        # only the left neighbour of this band can hold a stale value.
+        if lo > 0:
+            cur[lo - 1] = _BIG
+        ai = a[i]
+        for j in range(lo, hi):
+            cost = abs(ai - b[j])
+            if i == 0 and j == 0:
+                cur[j] = cost
+                continue
+            best = _BIG
+            if i > 0 and j > 0:
+                best = prev[j - 1]
+            if j > 0 and cur[j - 1] < best:
+                best = cur[j - 1]
+            if i > 0 and prev[j] < best:
+                best = prev[j]
+            cur[j] = cost + best
+        prev, cur = cur, prev
+    return prev[m - 1]
+
+
+@njit(cache=True, parallel=True, nogil=True)
+def dtw_band_many(a: np.ndarray, b: np.ndarray, radius: int) -> np.ndarray:
+    """dtw_band(a, b[k], radius) for every row of b, rows spread over numba's threads."""
+    out = np.empty(b.shape[0])
+    for k in prange(b.shape[0]):
+        out[k] = dtw_band(a, b[k], radius)
+    return out
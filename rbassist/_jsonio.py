@@ -0,0 +1,46 @@
+"""JSON file read/write on orjson when it is installed, else the stdlib json module."""
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+from typing import Any
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # type: ignore
+
+
+# Above this size files are written compact; indenting them mostly costs time.
+PRETTY_MAX_BYTES = 1 << 20
+
+
+def write_bytes_atomic(path: pathlib.Path, data: bytes) -> None:
+    """Write to a sibling temp file and os.replace it in, so readers never see a partial file."""
+    path = pathlib.Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def read_json(path: pathlib.Path) -> Any:
+    if orjson is not None:
+        return orjson.loads(pathlib.Path(path).read_bytes())
+    return json.loads(pathlib.Path(path).read_text("utf-8"))
+
+
+def write_json(path: pathlib.Path, data: Any) -> None:
+    """UTF-8 JSON (non-ASCII written as-is, not \\u-escaped), replaced atomically.
+
+    Two-space indented unless the compact form exceeds PRETTY_MAX_BYTES.
+    """
+    if orjson is not None:
+        raw = orjson.dumps(data)
+        if len(raw) <= PRETTY_MAX_BYTES:
+            raw = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if len(raw) <= PRETTY_MAX_BYTES:
+            raw = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    write_bytes_atomic(path, raw)
@@ -0,0 +1,65 @@
+"""Peak picking for the sampling onset curves (scipy find_peaks' height/distance subset)."""
+from __future__ import annotations
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, nogil=True)
+def _local_maxima(x: np.ndarray) -> np.ndarray:
+    """Indices of local maxima; a flat top counts once, at its (left-rounded) midpoint.
+
+    Same rule as scipy's _local_maxima_1d: strictly higher than the sample
+    before the plateau and the one after it, never at either end of x.
+    """
+    out = np.empty(x.shape[0] // 2 + 1, dtype=np.int64)
+    m = 0
+    i = 1
+    i_max = x.shape[0] - 1
+    while i < i_max:
+        if x[i - 1] < x[i]:
+            ahead = i + 1
+            while ahead < i_max and x[ahead] == x[i]:
+                ahead += 1
+            if x[ahead] < x[i]:
+                out[m] = (i + ahead - 1) // 2
+                m += 1
+                i = ahead
+        i += 1
+    return out[:m]
+
+
+@njit(cache=True, nogil=True)
+def _keep_by_distance(peaks: np.ndarray, by_priority: np.ndarray, distance: int) -> np.ndarray:
+    """Mask of peaks kept when, highest first, each one suppresses neighbours closer than `distance`."""
+    keep = np.ones(peaks.shape[0], dtype=np.bool_)
+    for r in range(by_priority.shape[0] - 1, -1, -1):
+        j = by_priority[r]
+        if not keep[j]:
+            continue
+        k = j - 1
+        while k >= 0 and peaks[j] - peaks[k] < distance:
+            keep[k] = False
+            k -= 1
+        k = j + 1
+        while k < peaks.shape[0] and peaks[k] - peaks[j] < distance:
+            keep[k] = False
+            k += 1
+    return keep
+
+
+def find_peaks(x: np.ndarray, height: float, distance: int) -> tuple[np.ndarray, dict]:
+    """scipy.signal.find_peaks(x, height=height, distance=distance) without the other properties.
+
+    Returns (peaks, {"peak_heights": ...}) like scipy; the maxima scan and the
+    distance suppression are numba loops and the priority order is the same
+    np.argsort scipy uses, so ties resolve identically.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    peaks = _local_maxima(x)
+    peaks = peaks[x[peaks] >= height]
+    heights = x[peaks]
+    if peaks.shape[0] > 1 and distance > 1:
+        keep = _keep_by_distance(peaks, np.argsort(heights), int(np.ceil(distance)))
+        peaks, heights = peaks[keep], heights[keep]
+    return peaks, {"peak_heights": heights}
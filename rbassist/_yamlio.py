@@ -0,0 +1,19 @@
+"""safe_load / safe_dump on libyaml's C parser and emitter when PyYAML was built with it.
+
+yaml is imported on first use, so importing prefs/playlist_presets stays cheap.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+
+def safe_load(text: str) -> Any:
+    import yaml
+
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def safe_dump(data: Any, sort_keys: bool = False) -> str:
+    import yaml
+
+    return yaml.dump(data, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper), sort_keys=sort_keys)
@@ -7,10 +7,12 @@ from concurrent.futures import ProcessPoolExecutor, as_completed
 from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn, TaskID
 from .utils import current_file_sig, console, MetaManager
 try:
-    from .features import samples_score, bass_contour, rhythm_contour
+    from .features import FeatureCache, samples_score, bass_contour, bass_contour_torch, rhythm_contour
 except Exception:
+    FeatureCache = None  # type: ignore
     samples_score = None  # type: ignore
     bass_contour = None  # type: ignore
+    bass_contour_torch = None  # type: ignore
     rhythm_contour = None  # type: ignore
 
 # Krumhansl & Kessler key profiles (major/minor)
@@ -56,9 +58,9 @@ warnings.filterwarnings(
 )
 
 
-def _estimate_tempo(y: np.ndarray, sr: int) -> float:
+def _estimate_tempo(y: np.ndarray, sr: int, cache=None) -> float:
     # robust onset envelope + median tempo
-    oe = librosa.onset.onset_strength(y=y, sr=sr)
+    oe = cache.onset_env() if cache is not None else librosa.onset.onset_strength(y=y, sr=sr)
     t = librosa.beat.tempo(onset_envelope=oe, sr=sr, aggregate=np.median)
     return float(t.item()) if np.ndim(t) else float(t)
 
@@ -93,11 +95,14 @@ def _analyze_single(
     path: str,
     duration_s: int = 90,
     add_cues: bool = True,
+    device: str | None = None,
 ) -> tuple[str, dict | None, str | None, str | None]:
     warn: str | None = None
     try:
         y, sr = librosa.load(path, sr=None, mono=True, duration=duration_s if duration_s > 0 else None)
-        bpm = _estimate_tempo(y, sr)
+        # one STFT/onset envelope shared by tempo, cues and the feature extractors
+        cache = FeatureCache(y, sr, device) if FeatureCache is not None else None
+        bpm = _estimate_tempo(y, sr, cache)
         camelot, full = _estimate_key(y, sr)
         result: dict = {
             "bpm": round(float(bpm), 2),
@@ -108,19 +113,22 @@ def _analyze_single(
             try:
                 from .cues import propose_cues
 
-                result["cues"] = propose_cues(y, sr, bpm=result["bpm"])
+                result["cues"] = propose_cues(y, sr, bpm=result["bpm"], cache=cache)
             except Exception:
                 pass
         try:
             feats: dict[str, object] = {}
             if samples_score is not None:
-                feats["samples"] = float(samples_score(y, sr))
+                feats["samples"] = float(samples_score(y, sr, device, cache=cache))
             if bass_contour is not None:
-                contour, rel = bass_contour(y, sr)
+                if device and device != "cpu" and bass_contour_torch is not None:
+                    contour, rel = bass_contour_torch(y, sr, device)
+                else:
+                    contour, rel = bass_contour(y, sr)
                 ds = librosa.util.fix_length(contour, size=256).astype(float).tolist()
                 feats["bass_contour"] = {"contour": ds, "reliability": float(rel)}
             if rhythm_contour is not None:
-                rcont, rrel = rhythm_contour(y, sr)
+                rcont, rrel = rhythm_contour(y, sr, cache=cache)
                 feats["rhythm_contour"] = {
                     "contour": librosa.util.fix_length(rcont, size=256).astype(float).tolist(),
                     "reliability": float(rrel),
@@ -142,7 +150,13 @@ def analyze_bpm_key(
     add_cues: bool = True,
     progress_callback: Optional[Callable[[int, int, str], None]] = None,
     workers: int | None = None,
+    device: str | None = None,
 ) -> None:
+    """Analyze BPM/key/cues/features for `paths` into meta.
+
+    `device` (e.g. "cuda") moves the bass-contour and samples STFTs to torch on that device;
+    it only applies to serial runs, since worker processes stay CPU-only.
+    """
     with MetaManager() as meta_mgr:
         meta = meta_mgr.meta
         sig_cache: dict[str, str] = {}
@@ -233,7 +247,7 @@ def analyze_bpm_key(
                         _apply_result(path, result, warn, err)
             else:
                 for p in to_do:
-                    _path, result, err, warn = _analyze_single(p, duration_s, add_cues)
+                    _path, result, err, warn = _analyze_single(p, duration_s, add_cues, device)
                     _apply_result(p, result, warn, err)
 
             console.print(f"[green]Analyzed {len(to_do)} files (BPM + Key).")
@@ -1,14 +1,11 @@
 from __future__ import annotations
 import pathlib
-import librosa
 import csv
 from datetime import datetime
 from typing import List, Optional, Dict, Tuple
 import typer
-from .analyze import analyze_bpm_key
 from .utils import load_meta, save_meta, console, walk_audio, pick_device
 from .sampling_profile import load_sampling_params
-from .beatgrid import analyze_paths as analyze_beatgrid_paths, BeatgridConfig
 
 
 # ------------------------------
@@ -25,7 +22,10 @@ def cmd_analyze(
     only_new: bool = typer.Option(True, help="Skip files already analyzed with same signature"),
     force: bool = typer.Option(False, help="Force re-analyze even if cached"),
     workers: int = typer.Option(12, help="Process workers for BPM/Key (0 = serial)"),
+    device: str = typer.Option("cpu", help="Device for the bass-contour STFT in serial runs: cpu|cuda|mps"),
 ):
+    from .analyze import analyze_bpm_key
+
     files = walk_audio(paths)
     if not files:
         console.print("[yellow]No audio files found in given paths.")
@@ -36,6 +36,7 @@ def cmd_analyze(
         only_new=only_new,
         force=force,
         workers=(workers if workers > 0 else None),
+        device=(pick_device(device) if device != "cpu" else None),
     )
 
 
@@ -51,6 +52,8 @@ def cmd_beatgrid(
     device: str = typer.Option("auto", help="cuda|cpu|auto (for BeatNet backend)"),
     overwrite: bool = typer.Option(True, help="Recompute beatgrid even if tempos already exist"),
 ):
+    from .beatgrid import analyze_paths as analyze_beatgrid_paths, BeatgridConfig
+
     cfg = BeatgridConfig(
         mode=mode.lower().strip(),
         drift_pct=max(0.1, float(drift_pct)),
@@ -86,6 +89,8 @@ def cmd_embed(
     ),
     timbre: bool = typer.Option(False, help="Also write a timbre-only embedding using OpenL3"),
     timbre_size: int = typer.Option(512, help="OpenL3 embedding size (128/256/512)"),
+    decode_processes: bool = typer.Option(False, help="Decode in worker processes instead of threads (helps MP3/audioread-heavy crates)"),
+    precision: str = typer.Option("auto", help="MERT weight precision: auto|bf16|fp16|fp32"),
 ):
     # Enforce canonical embedding defaults to keep library consistent.
     if duration_s != 120:
@@ -112,6 +117,8 @@ def cmd_embed(
         batch_size=batch_size,
         timbre=timbre,
         timbre_size=timbre_size,
+        decode_processes=decode_processes,
+        precision=precision,
     )
 
 
@@ -128,6 +135,7 @@ def cmd_reanalyze(
     timbre: bool = typer.Option(False, help="Also write timbre embeddings (OpenL3) and blend them into main embeddings"),
     timbre_size: int = typer.Option(512, help="OpenL3 embedding size (128/256/512)"),
 ):
+    from .analyze import analyze_bpm_key
     from .embed import build_embeddings
 
     params = load_sampling_params(profile or "")
@@ -183,7 +191,8 @@ def cmd_recommend(
     camelot_neighbors: bool = typer.Option(True, help="Filter by Camelot compatibility"),
     w_ann: float = typer.Option(0.0, help="Weight: ANN base score"),
     w_samples: float = typer.Option(0.0, help="Weight: samples score (0..1)"),
-    w_bass: float = typer.Option(0.0, help="Weight: bass contour similarity (0..1)")
+    w_bass: float = typer.Option(0.0, help="Weight: bass contour similarity (0..1)"),
+    plain: bool = typer.Option(False, "--plain", help="Print tab-separated rows instead of a table"),
 ):
     try:
         from .recommend import recommend as do_rec
@@ -197,6 +206,7 @@ def cmd_recommend(
         allow_doubletime=allow_doubletime,
         camelot_neighbors=camelot_neighbors,
         weights={"ann": w_ann, "samples": w_samples, "bass": w_bass},
+        plain=plain,
     )
 
 
@@ -204,13 +214,14 @@ def cmd_recommend(
 def cmd_recommend_sequence(
     seeds: List[str] = typer.Argument(..., help="One or more seed paths or substrings"),
     top: int = typer.Option(25, help="Top N results to return"),
+    plain: bool = typer.Option(False, "--plain", help="Print tab-separated rows instead of a table"),
 ):
     try:
         from .recommend import recommend_sequence as do_rec_seq
     except Exception as e:
         console.print(f"[red]Recommend deps missing (hnswlib). Error: {e}")
         raise typer.Exit(1)
-    do_rec_seq(seeds, top=top)
+    do_rec_seq(seeds, top=top, plain=plain)
 
 
 @app.command("bandcamp-import")
@@ -437,11 +448,14 @@ def cmd_djlink():
 
 @app.command("cues")
 def cmd_cues(path: str, duration: int = 120):
+    import librosa
     from .cues import propose_cues
     from .analyze import _estimate_tempo
+    from .features import FeatureCache
     y, sr = librosa.load(path, sr=None, mono=True, duration=duration if duration > 0 else None)
-    bpm = _estimate_tempo(y, sr)
-    cues = propose_cues(y, sr, bpm=bpm)
+    cache = FeatureCache(y, sr)
+    bpm = _estimate_tempo(y, sr, cache)
+    cues = propose_cues(y, sr, bpm=bpm, cache=cache)
     meta = load_meta()
     info = meta["tracks"].setdefault(path, {})
     info.setdefault("bpm", round(float(bpm), 2))
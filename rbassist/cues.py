@@ -7,8 +7,11 @@ def _bars_to_seconds(bars: int, bpm: float) -> float:
     return (bars * 4.0) * (60.0 / bpm)
 
 
-def detect_drop(y: np.ndarray, sr: int) -> float:
-    onset_env = librosa.onset.onset_strength(y=y, sr=sr, aggregate=np.median)
+def detect_drop(y: np.ndarray, sr: int, cache=None) -> float:
+    if cache is not None:
+        onset_env = cache.onset_env(np.median)
+    else:
+        onset_env = librosa.onset.onset_strength(y=y, sr=sr, aggregate=np.median)
     times = librosa.times_like(onset_env, sr=sr)
     mask = times > 15.0
     if not np.any(mask):
@@ -17,14 +20,15 @@ def detect_drop(y: np.ndarray, sr: int) -> float:
     return float(times[mask][idx])
 
 
-def propose_cues(y: np.ndarray, sr: int, bpm: float) -> list[dict]:
+def propose_cues(y: np.ndarray, sr: int, bpm: float, cache=None) -> list[dict]:
+    """`cache` is an optional features.FeatureCache for `y`, reused for the onset envelopes."""
     loop_bars = 16 if bpm >= 122 else 8
 
-    drop_t = detect_drop(y, sr)
+    drop_t = detect_drop(y, sr, cache)
     c_end = max(0.0, drop_t - 0.1)
     c_start = max(0.0, c_end - _bars_to_seconds(loop_bars, bpm))
 
-    onset = librosa.onset.onset_strength(y=y, sr=sr)
+    onset = cache.onset_env() if cache is not None else librosa.onset.onset_strength(y=y, sr=sr)
     times = librosa.times_like(onset, sr=sr)
     first_kick_t = float(times[np.argmax(onset > np.percentile(onset, 75))]) if onset.size else 0.0
 
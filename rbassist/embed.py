@@ -1,29 +1,59 @@
 from __future__ import annotations
 
 import os, pathlib, numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import contextlib
+import multiprocessing
+import queue
+import shutil
+import struct
+import threading
 import librosa, soundfile as sf
 import warnings
 from typing import Callable, List, Optional
-from transformers import AutoModel, Wav2Vec2FeatureExtractor
+from transformers import AutoConfig, AutoModel, Wav2Vec2FeatureExtractor
 import torch
 from rich.progress import Progress
-from .utils import console, EMB, load_meta, save_meta
+from .utils import console, EMB, load_meta, save_meta, file_sig_head
 from .prefs import mode_for_path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from .sampling_profile import SamplingParams, pick_windows
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .sampling_profile import SamplingParams, pick_windows_from_array
 try:
     import openl3  # type: ignore
 except Exception:
     openl3 = None  # type: ignore
+try:
+    import torchaudio  # type: ignore
+except Exception:
+    torchaudio = None  # type: ignore
+try:
+    from safetensors.torch import load_file as load_safetensors, save_model as save_safetensors  # type: ignore
+except Exception:
+    load_safetensors = save_safetensors = None  # type: ignore
 
 DEFAULT_MODEL = "m-a-p/MERT-v1-330M"
 SAMPLE_RATE = 24000  # per model card
 os.environ.setdefault("HF_HOME", str(pathlib.Path.home() / ".cache" / "huggingface"))
+# ROCm: use MIOpen's fast find mode (kernel search results come from the
+# on-disk find-db instead of a per-shape benchmark) and enable AOTriton kernels.
+os.environ.setdefault("MIOPEN_FIND_MODE", "2")
+os.environ.setdefault("TORCH_ROCM_AOTRITON_ENABLE_EXPERIMENTAL", "1")
 TIMBRE_SR = 48000
 TIMBRE_FRAME_S = 1.0
 TIMBRE_OVERLAP = 0.5
 W_MERT = 0.7
 W_TIMBRE = 0.3
+# Each embedding kind lives in one fp16 matrix (row index in meta as
+# info[kind + "_row"]); the combined "embedding" also keeps its per-track .npy.
+SHARD_KINDS = ("embedding", "embedding_mert", "embedding_timbre")
+SHARD_ALIGN = 256
+SHARD_FLUSH_EVERY = 64
+# Fixed MERT input lengths (samples @ 24 kHz): 10 s intro/late, 30 s sampling
+# tails, 40/60 s cores, 90 s sampling main window. Inputs are padded up to the
+# smallest bucket that fits so each shape is warmed up and captured only once.
+BUCKETS = tuple(int(s * SAMPLE_RATE) for s in (10, 30, 40, 60, 90))
+GRAPH_BATCH = 4
 
 # Quiet known noisy warnings that are not actionable for users.
 warnings.filterwarnings(
@@ -63,39 +93,430 @@ def _resolve_device(requested: str | None) -> str:
     raise ValueError(f"Unsupported device '{requested}'. Use 'cuda', 'rocm', 'mps', or 'cpu'.")
 
 
+def _bucket_for(n_samples: int) -> int | None:
+    """Smallest bucket length that fits n_samples, or None if it exceeds all buckets."""
+    for length in BUCKETS:
+        if n_samples <= length:
+            return length
+    return None
+
+
+def _bucketize(sizes: list[int]) -> dict[int | None, list[int]]:
+    """Group item indices by the bucket each length pads into (None = longer than every bucket)."""
+    groups: dict[int | None, list[int]] = {}
+    for i, n in enumerate(sizes):
+        groups.setdefault(_bucket_for(n), []).append(i)
+    return groups
+
+
+def _weights_cache_path(model_name: str) -> pathlib.Path:
+    return pathlib.Path(os.environ["HF_HOME"]) / "rbassist" / (model_name.replace("/", "--") + ".safetensors")
+
+
+def _load_model(model_name: str, device: str):
+    """Load MERT, preferring a single-file safetensors copy of its weights.
+
+    The first load goes through from_pretrained and writes the state dict to
+    HF_HOME/rbassist/<model>.safetensors. Later loads build the module on the
+    meta device (no random init) and mmap that one file straight onto the
+    target device. Delete the file to pick up new upstream weights.
+    """
+    cache = _weights_cache_path(model_name)
+    if load_safetensors is not None and cache.exists():
+        try:
+            config = AutoConfig.from_pretrained(model_name, trust_remote_code=True)
+            with torch.device("meta"):
+                model = AutoModel.from_config(config, trust_remote_code=True)
+            model.load_state_dict(load_safetensors(str(cache), device=device), strict=False, assign=True)
+            if any(t.is_meta for t in (*model.parameters(), *model.buffers())):
+                raise RuntimeError("cached weights do not cover the model")
+            return model.eval()
+        except Exception as e:
+            console.print(f"[yellow]Cached MERT weights unusable ({e}); loading from the hub cache.")
+    model = AutoModel.from_pretrained(model_name, trust_remote_code=True)
+    if save_safetensors is not None:
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache.with_suffix(".tmp")
+            save_safetensors(model, str(tmp), metadata={"format": "pt", "source": model_name})
+            os.replace(tmp, cache)
+        except Exception as e:
+            console.print(f"[yellow]Could not cache MERT weights: {e}")
+    return model.to(device)
+
+
 class MertEmbedder:
-    def __init__(self, model_name: str = DEFAULT_MODEL, device: str | None = None):
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        device: str | None = None,
+        cuda_graphs: bool = True,
+        graph_batch: int = GRAPH_BATCH,
+        torch_compile: bool = True,
+        precision: str = "auto",
+    ):
         req = _resolve_device(device)
         self.device = req
-        self.model = AutoModel.from_pretrained(model_name, trust_remote_code=True).to(self.device)
+        self.model = _load_model(model_name, self.device)
+        # Weight/input dtype (see _pick_precision); _amp_dtype is set only when
+        # fp32 weights run under fp16 autocast.
+        self.dtype, self._amp_dtype = self._pick_precision(precision)
+        if self.device == "cuda":
+            # TF32 for fp32 matmuls/convs (Ampere+). cudnn.benchmark autotunes the
+            # conv front-end once per input shape; shapes are fixed by BUCKETS,
+            # so that cost is paid during compile/warmup/capture, not per track.
+            torch.set_float32_matmul_precision("high")
+            torch.backends.cudnn.allow_tf32 = True
+            torch.backends.cudnn.benchmark = True
+        if self.dtype != torch.float32:
+            self.model = self.model.to(dtype=self.dtype)
+        # Only the final layer is pooled; don't materialize every hidden state
+        # or attention map (also pinned per call in _run).
+        self.model.config.output_hidden_states = False
+        self.model.config.output_attentions = False
+        # Only the extractor's settings are used; _fill does its normalization on
+        # the device, so the extractor itself never touches audio.
         self.processor = Wav2Vec2FeatureExtractor.from_pretrained(model_name, trust_remote_code=True)
+        self._do_normalize = bool(getattr(self.processor, "do_normalize", True))
+        self._pad_value = float(getattr(self.processor, "padding_value", 0.0))
+        self._use_mask = bool(getattr(self.processor, "return_attention_mask", False))
+        self._host_buf: torch.Tensor | None = None
+        self.graph_batch = max(1, int(graph_batch))
+        # bucket length -> (graph, static inputs, static last_hidden_state)
+        self._graphs: dict[int, tuple[torch.cuda.CUDAGraph, dict[str, torch.Tensor], torch.Tensor]] = {}
+        self._static: dict[int, dict[str, torch.Tensor]] = {}
+        # source sample rate -> cached torchaudio resampler (on self.device)
+        self._resamplers: dict[int, "torchaudio.transforms.Resample"] = {}
+        # Input uploads run on their own stream so they overlap the previous forward.
+        self._h2d_stream = torch.cuda.Stream() if self.device == "cuda" else None
+        compiled = False
+        if torch_compile and self.device == "cuda":
+            # Our own per-bucket graphs already remove launch overhead, so only
+            # let inductor add its cudagraphs when those are turned off.
+            compiled = self._compile("default" if cuda_graphs else "reduce-overhead")
+        if cuda_graphs and self.device == "cuda":
+            self._capture_graphs()
+        elif self.device in {"cuda", "mps"} and not compiled:
+            self._warmup()
 
-    def encode_array(self, y: np.ndarray, sr: int) -> np.ndarray:
-        if sr != SAMPLE_RATE:
+    def _pick_precision(self, precision: str) -> tuple[torch.dtype, torch.dtype | None]:
+        """(weight dtype, autocast dtype or None) for `precision` on this device.
+
+        - "auto": bf16 weights on GPUs with native bf16 (Ampere+), otherwise
+          fp32 weights under fp16 autocast; plain fp32 on CPU.
+        - "bf16" / "fp16": weights stored in that dtype, no autocast
+          (bf16 falls back to "auto" where it isn't supported).
+        - "fp32": full precision everywhere.
+        """
+        precision = (precision or "auto").lower()
+        if self.device == "cpu" or precision == "fp32":
+            return torch.float32, None
+        if precision == "fp16":
+            return torch.float16, None
+        if self.device == "cuda" and torch.cuda.is_bf16_supported():
+            return torch.bfloat16, None
+        if precision == "bf16":
+            console.print("[yellow]bf16 not supported on this device; using fp16 autocast.")
+        return torch.float32, torch.float16
+
+    def _autocast(self):
+        """Autocast context for the forward (fp16 over fp32 weights), or a no-op."""
+        if self._amp_dtype is None:
+            return contextlib.nullcontext()
+        # The autocast weight-cast cache must be off for CUDA graph capture.
+        return torch.autocast(device_type=self.device, dtype=self._amp_dtype, cache_enabled=False)
+
+    def _run(self, inputs: dict[str, torch.Tensor], model=None) -> torch.Tensor:
+        """Forward pass returning only last_hidden_state [B, T, 1024]."""
+        model = self.model if model is None else model
+        out = model(**inputs, output_hidden_states=False, output_attentions=False)
+        return out.last_hidden_state
+
+    def _compile(self, mode: str) -> bool:
+        """torch.compile the model for the fixed bucket shapes and compile each one up front.
+
+        Falls back to the eager model (returning False) if compilation fails,
+        e.g. when Triton is not available.
+        """
+        try:
+            compiled = torch.compile(self.model, mode=mode, fullgraph=False, dynamic=False)
+            # Allocate the bucket buffers outside inference mode: _fill writes
+            # them in place later, which inference tensors do not allow.
+            static = [self._static_inputs(length) for length in BUCKETS]
+            with torch.inference_mode(), self._autocast():
+                for inputs in static:
+                    self._run(inputs, compiled)
+        except Exception as e:
+            console.print(f"[yellow]torch.compile disabled: {e}")
+            return False
+        self.model = compiled
+        return True
+
+    def _warmup(self) -> None:
+        """One dummy forward per bucket to populate MIOpen (ROCm) / Metal kernel caches."""
+        for length in BUCKETS:
+            inputs = self._static_inputs(length)
+            try:
+                with torch.inference_mode(), self._autocast():
+                    self._run(inputs)
+            except Exception as e:
+                console.print(f"[yellow]Warmup skipped ({length / SAMPLE_RATE:.0f}s bucket): {e}")
+                return
+
+    def _static_inputs(self, length: int) -> dict[str, torch.Tensor]:
+        """Device-resident [graph_batch, length] input buffers, allocated once per bucket.
+
+        Buffers are dense row-major, which is already the layout the feature
+        encoder's first Conv1d wants (channels_last only exists for 4-D tensors),
+        so cuDNN never inserts a layout conversion in front of it.
+        """
+        inputs = self._static.get(length)
+        if inputs is None:
+            inputs = {"input_values": torch.zeros(self.graph_batch, length, dtype=self.dtype, device=self.device)}
+            if self._use_mask:
+                inputs["attention_mask"] = torch.ones(self.graph_batch, length, dtype=torch.long, device=self.device)
+            self._static[length] = inputs
+        return inputs
+
+    def _capture_graphs(self) -> None:
+        """Warm up every bucket shape, then capture one CUDA graph per bucket.
+
+        All graphs share a single memory pool so scratch space is reused across
+        buckets instead of being reserved once per graph. If capture fails (for
+        example a model forward that syncs on data), we keep eager execution.
+        """
+        pool = torch.cuda.graph_pool_handle()
+        for length in BUCKETS:
+            static_in = self._static_inputs(length)
+            try:
+                with torch.inference_mode():
+                    side = torch.cuda.Stream()
+                    side.wait_stream(torch.cuda.current_stream())
+                    with torch.cuda.stream(side), self._autocast():
+                        for _ in range(2):
+                            self._run(static_in)
+                    torch.cuda.current_stream().wait_stream(side)
+                    graph = torch.cuda.CUDAGraph()
+                    with torch.cuda.graph(graph, pool=pool), self._autocast():
+                        static_out = self._run(static_in)
+            except Exception as e:
+                console.print(f"[yellow]CUDA graph capture disabled ({length / SAMPLE_RATE:.0f}s bucket): {e}")
+                self._graphs.clear()
+                return
+            self._graphs[length] = (graph, static_in, static_out)
+
+    def _to_host(self, vecs: torch.Tensor, dtype: torch.dtype = torch.float16) -> np.ndarray:
+        """Copy pooled [B, 1024] vectors to host as `dtype` (the only D2H transfer).
+
+        The cast happens on the device, so with the default fp16 (also the
+        on-disk dtype) only half the bytes cross the bus. On CUDA the copy lands
+        in a reusable pinned buffer with non_blocking=True and we synchronize
+        just before handing the values back to NumPy.
+        """
+        if self.device != "cuda":
+            return vecs.to("cpu", dtype=dtype).numpy()
+        n = vecs.numel()
+        if self._host_buf is None or self._host_buf.numel() < n or self._host_buf.dtype != dtype:
+            self._host_buf = torch.empty(n, dtype=dtype, pin_memory=True)
+        host = self._host_buf[:n].view(vecs.shape)
+        host.copy_(vecs.to(dtype), non_blocking=True)
+        torch.cuda.current_stream().synchronize()
+        return host.numpy().copy()  # the pinned buffer is reused by the next call
+
+    def _masked_mean(self, feats: torch.Tensor, lengths: list[int], padded_len: int) -> torch.Tensor:
+        """Mean over each item's real frames, ignoring frames produced by padding (in fp32)."""
+        feats = feats.float()
+        n_frames = feats.shape[1]
+        lens = torch.tensor(lengths, device=feats.device)
+        to_frames = getattr(self.model, "_get_feat_extract_output_lengths", None)
+        if to_frames is not None:
+            frames = to_frames(lens)
+        else:
+            frames = torch.ceil(lens.float() * n_frames / padded_len).long()
+        frames = frames.clamp(min=1, max=n_frames)
+        mask = (torch.arange(n_frames, device=feats.device)[None, :] < frames[:, None]).to(feats.dtype)
+        return (feats * mask.unsqueeze(-1)).sum(dim=1) / mask.sum(dim=1, keepdim=True)
+
+    def _resample(self, y, sr: int) -> torch.Tensor:
+        """Mono audio -> float32 tensor at SAMPLE_RATE on the model device.
+
+        The raw samples are copied to the device once and resampled there with a
+        cached torchaudio kernel per source rate; librosa is the fallback when
+        torchaudio is not installed.
+        """
+        if sr != SAMPLE_RATE and torchaudio is None:
+            if isinstance(y, torch.Tensor):
+                y = y.numpy()
             y = librosa.resample(y, orig_sr=sr, target_sr=SAMPLE_RATE)
             sr = SAMPLE_RATE
-        inputs = self.processor(y, sampling_rate=sr, return_tensors="pt")
-        with torch.no_grad():
-            out = self.model(**{k: v.to(self.device) for k, v in inputs.items()}, output_hidden_states=True)
-        feats = out.hidden_states[-1].squeeze(0)  # [T, 1024]
-        vec = feats.mean(dim=0).cpu().numpy().astype(np.float32)
-        return vec
-
-    def encode_batch(self, items: list[tuple[np.ndarray, int]]) -> list[np.ndarray]:
-        """Batch version of encode_array; items are (audio, sr)."""
+        x = self._upload(y)
+        if sr == SAMPLE_RATE:
+            return x
+        resampler = self._resamplers.get(sr)
+        if resampler is None:
+            resampler = torchaudio.transforms.Resample(
+                sr,
+                SAMPLE_RATE,
+                lowpass_filter_width=16,
+                resampling_method="sinc_interp_kaiser",
+            ).to(self.device)
+            self._resamplers[sr] = resampler
+        return resampler(x)
+
+    def stage(self, y: np.ndarray):
+        """Pin audio in page-locked memory ahead of its upload (CUDA only).
+
+        Safe to call from decode threads, so the pinning copy happens off the
+        thread that drives the GPU. Other devices get y back unchanged.
+        """
+        if self._h2d_stream is None:
+            return y
+        return torch.from_numpy(np.ascontiguousarray(y, dtype=np.float32)).pin_memory()
+
+    def _upload(self, y) -> torch.Tensor:
+        """Copy samples to the device; on CUDA via pinned memory on the H2D stream.
+
+        The compute stream waits on the copy's event, so work queued after this
+        call sees the data while already-queued kernels keep running. Tensors
+        from stage() are already pinned and are copied as is.
+        """
+        if isinstance(y, torch.Tensor):
+            x = y
+        else:
+            x = torch.from_numpy(np.ascontiguousarray(y, dtype=np.float32))
+        if self._h2d_stream is None:
+            return x.to(self.device)
+        if not x.is_pinned():
+            x = x.pin_memory()
+        with torch.cuda.stream(self._h2d_stream):
+            dev = x.to(self.device, non_blocking=True)
+            copied = torch.cuda.Event()
+            copied.record()
+        compute = torch.cuda.current_stream()
+        compute.wait_event(copied)
+        dev.record_stream(compute)
+        return dev
+
+    def _fill(self, inputs: dict[str, torch.Tensor], waves: list[torch.Tensor]) -> None:
+        """Normalize waves like Wav2Vec2FeatureExtractor and pad them into the rows of inputs.
+
+        Normalization runs once over the stacked [n, longest] fp32 batch using
+        per-row masked statistics. Rows past len(waves) are left as silence with
+        a full attention mask so unused graph slots never produce NaNs.
+        """
+        values = inputs["input_values"]
+        mask = inputs.get("attention_mask")
+        n = len(waves)
+        pad_value = self._pad_value
+        lens = torch.tensor([w.shape[0] for w in waves], device=values.device)
+        batch = torch.nn.utils.rnn.pad_sequence(waves, batch_first=True)  # [n, longest] fp32
+        valid = torch.arange(batch.shape[1], device=values.device)[None, :] < lens[:, None]
+        if self._do_normalize:
+            count = lens[:, None].to(batch.dtype)
+            mean = batch.sum(dim=1, keepdim=True) / count
+            var = (((batch - mean) * valid) ** 2).sum(dim=1, keepdim=True) / count
+            batch = (batch - mean) / torch.sqrt(var + 1e-7)
+        values.fill_(pad_value)
+        values[:n, : batch.shape[1]] = torch.where(valid, batch, batch.new_tensor(pad_value))
+        if mask is not None:
+            mask[n:] = 1
+            mask[:n] = 0
+            mask[:n, : batch.shape[1]] = valid
+
+    def encode_array(self, y: np.ndarray, sr: int, store_dtype: torch.dtype = torch.float16) -> np.ndarray:
+        return self.encode_packed([(y, sr)], store_dtype)[0]
+
+    def encode_batch(
+        self,
+        items: list[tuple[np.ndarray, int]],
+        store_dtype: torch.dtype = torch.float16,
+    ) -> list[np.ndarray]:
+        """Batch version of encode_array; items are (audio, sr), audio as NumPy or from stage().
+
+        Items are grouped by bucket first, so a 10 s intro is never padded up to
+        the length of a 90 s window that happens to share its batch. Results are
+        returned in input order.
+        """
         if not items:
             return []
-        arrays: list[np.ndarray] = []
-        for y, sr in items:
-            if sr != SAMPLE_RATE:
-                y = librosa.resample(y, orig_sr=sr, target_sr=SAMPLE_RATE)
-            arrays.append(y)
-        inputs = self.processor(arrays, sampling_rate=SAMPLE_RATE, return_tensors="pt", padding=True)
-        with torch.no_grad():
-            out = self.model(**{k: v.to(self.device) for k, v in inputs.items()}, output_hidden_states=True)
-        feats = out.hidden_states[-1]  # [B, T, 1024]
-        vecs = feats.mean(dim=1).cpu().numpy().astype(np.float32)
-        return [vecs[i] for i in range(len(items))]
+        # Bucket on the post-resample length so inputs can be uploaded lazily.
+        sizes = [int(np.ceil(len(y) * SAMPLE_RATE / sr)) for y, sr in items]
+        chunks: list[list[int]] = []
+        for bucket, idxs in _bucketize(sizes).items():
+            step = self.graph_batch if self.device != "cpu" and bucket is not None else len(idxs)
+            chunks.extend(idxs[i : i + step] for i in range(0, len(idxs), step))
+
+        def _prepare(chunk_idx: list[int]) -> list[torch.Tensor]:
+            return [self._resample(*items[j]) for j in chunk_idx]
+
+        out: list[np.ndarray | None] = [None] * len(items)
+        waves = _prepare(chunks[0])
+        for n, chunk_idx in enumerate(chunks):
+            feats, padded_len = self._forward(waves)  # [B, T, 1024]
+            pooled = self._masked_mean(feats, [len(w) for w in waves], padded_len)
+            # Double-buffer: queue the next chunk's upload/resample behind this forward.
+            if n + 1 < len(chunks):
+                waves = _prepare(chunks[n + 1])
+            vecs = self._to_host(pooled, store_dtype)
+            for k, j in enumerate(chunk_idx):
+                out[j] = vecs[k]
+        return out  # type: ignore[return-value]
+
+    def _forward(self, waves: list[torch.Tensor]) -> tuple[torch.Tensor, int]:
+        """Run MERT on 24 kHz device tensors; returns (last_hidden_state, padded input length).
+
+        On GPU/MPS, batches that fit a bucket are padded to exactly
+        [graph_batch, bucket] so every forward reuses a warmed-up shape, and are
+        replayed through the bucket's CUDA graph when one was captured. CPU and
+        over-long inputs pad only to the longest item and run eagerly.
+        """
+        n = len(waves)
+        longest = max(len(w) for w in waves)
+        bucket = _bucket_for(longest)
+        if bucket is None or self.device == "cpu" or n > self.graph_batch:
+            return self._forward_packed(waves)
+        captured = self._graphs.get(bucket)
+        static_in = self._static_inputs(bucket)
+        self._fill(static_in, waves)
+        if captured is not None:
+            graph, _, static_out = captured
+            graph.replay()
+            return static_out[:n], bucket
+        with torch.inference_mode(), self._autocast():
+            feats = self._run(static_in)
+        return feats[:n], bucket
+
+    def _forward_packed(self, waves: list[torch.Tensor]) -> tuple[torch.Tensor, int]:
+        """One eager forward over all waves padded to the longest, with an attention mask."""
+        n = len(waves)
+        longest = max(len(w) for w in waves)
+        inputs = {"input_values": torch.empty(n, longest, dtype=self.dtype, device=self.device)}
+        if self._use_mask:
+            inputs["attention_mask"] = torch.empty(n, longest, dtype=torch.long, device=self.device)
+        self._fill(inputs, waves)
+        with torch.inference_mode(), self._autocast():
+            feats = self._run(inputs)
+        return feats, longest
+
+    def encode_packed(
+        self,
+        items: list[tuple[np.ndarray, int]],
+        store_dtype: torch.dtype = torch.float16,
+    ) -> list[np.ndarray]:
+        """Embed items of any lengths in a single forward (padded to the longest).
+
+        Each item's vector is a masked mean over its own frames only. Unlike
+        encode_batch this ignores buckets: one launch, more padding. MERT's
+        attention has no variable-length (cu_seqlens) kernel, so padding plus
+        a mask is as packed as a batch can get.
+        """
+        if not items:
+            return []
+        waves = [self._resample(y, sr) for y, sr in items]
+        feats, padded_len = self._forward_packed(waves)
+        pooled = self._masked_mean(feats, [len(w) for w in waves], padded_len)
+        vecs = self._to_host(pooled, store_dtype)
+        return [vecs[k] for k in range(len(items))]
 
     def embed(self, audio_path: str, duration_s: int = 120) -> np.ndarray:
         y, sr = librosa.load(audio_path, sr=None, mono=True)
@@ -104,6 +525,29 @@ class MertEmbedder:
         return self.encode_array(y, sr)
 
 
+_OPENL3_MODELS: dict[tuple[str, str, int], object] = {}
+
+
+def _openl3_model(input_repr: str, content_type: str, embedding_size: int):
+    """Process-wide cache of loaded OpenL3 audio models."""
+    key = (input_repr, content_type, embedding_size)
+    model = _OPENL3_MODELS.get(key)
+    if model is None:
+        model = openl3.models.load_audio_embedding_model(
+            input_repr=input_repr,
+            content_type=content_type,
+            embedding_size=embedding_size,
+        )
+        try:
+            # XLA-compile predict() so the kapre mel front-end and conv stack
+            # run as fused kernels (Keras on TF >= 2.8; otherwise left as is).
+            model.compile(jit_compile=True)
+        except Exception:
+            pass
+        _OPENL3_MODELS[key] = model
+    return model
+
+
 class TimbreEmbedder:
     """Lightweight timbre-focused encoder using OpenL3 (music-mel)."""
 
@@ -111,15 +555,26 @@ class TimbreEmbedder:
         if openl3 is None:
             raise RuntimeError("openl3 not installed; pip install openl3")
         self.embedding_size = embedding_size
+        # Load the Keras model once; otherwise every get_audio_embedding call
+        # goes through OpenL3's model lookup/setup again.
+        self._model = _openl3_model("mel256", "music", embedding_size)
+
+    def _embed(self, audio, sr, **kwargs):
+        """openl3.get_audio_embedding on the cached model, dropping XLA if this TF build rejects it."""
+        try:
+            return openl3.get_audio_embedding(audio, sr, model=self._model, **kwargs)
+        except Exception:
+            if not getattr(self._model, "jit_compile", False):
+                raise
+            self._model.compile(jit_compile=False)
+            return openl3.get_audio_embedding(audio, sr, model=self._model, **kwargs)
 
     def encode_array(self, y: np.ndarray, sr: int) -> np.ndarray:
-        emb, _ = openl3.get_audio_embedding(
+        emb, _ = self._embed(
             y,
             sr,
             center=True,
-            hop_size=None,
-            content_type="music",
-            embedding_size=self.embedding_size,
+            hop_size=TIMBRE_FRAME_S * (1.0 - TIMBRE_OVERLAP),
         )
         if emb.ndim > 1:
             vec = emb.mean(axis=0)
@@ -127,29 +582,85 @@ class TimbreEmbedder:
             vec = emb
         return np.asarray(vec, dtype=np.float32)
 
+    def encode_batch(self, frames: np.ndarray, sr: int, batch_size: int = 64) -> np.ndarray:
+        """Embed [F, frame_len] frames in one OpenL3 call; returns [F, embedding_size]."""
+        embs, _ = self._embed(
+            list(frames),
+            [sr] * len(frames),
+            center=False,
+            hop_size=TIMBRE_FRAME_S,  # one OpenL3 window per 1 s frame
+            batch_size=batch_size,
+        )
+        return np.stack([np.asarray(e, dtype=np.float32).reshape(-1, self.embedding_size).mean(axis=0) for e in embs])
+
+
+def _mean_vecs(vecs: list[np.ndarray]) -> np.ndarray:
+    """Element-wise mean of equal-shape vectors without stacking them into a [K, D] copy."""
+    acc = np.array(vecs[0], dtype=np.float32)
+    for v in vecs[1:]:
+        acc += v
+    acc /= len(vecs)
+    return acc
+
+
+def _mean_var(a: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Column mean and population variance of [N, D]; the variance reuses the mean."""
+    m = a.mean(axis=0)
+    d = a - m
+    return m, np.einsum("ij,ij->j", d, d) / a.shape[0]
+
+
+def _load_sf(audio_path: str, max_s: float | None = None) -> tuple[np.ndarray, int]:
+    """Mono float32 audio at native rate via libsndfile, decoding at most max_s seconds.
+
+    libsndfile is C and releases the GIL, so loader threads overlap with the
+    rest of the pipeline. Formats it rejects (e.g. MP3 on old libsndfile,
+    AAC) fall back to librosa/audioread.
+    """
+    try:
+        with sf.SoundFile(audio_path) as f:
+            sr = f.samplerate
+            frames = f.frames if not max_s else min(f.frames, int(max_s * sr))
+            y = f.read(frames, dtype="float32", always_2d=True)
+    except (sf.LibsndfileError, RuntimeError):
+        return librosa.load(audio_path, sr=None, mono=True, duration=max_s or None)
+    return (y.mean(axis=1) if y.shape[1] > 1 else y[:, 0]), sr
+
+
+def _decode_track(
+    audio_path: str, duration_s: float, sampling: SamplingParams | None
+) -> tuple[np.ndarray, int, list[tuple[float, float]]]:
+    """Decode and pick windows (no model work); module-level so it can run in worker processes.
+
+    Windows stay at the native rate: MERT resamples each one on the device
+    and timbre only its intro/late windows. They never overlap, so this
+    touches fewer samples than resampling the whole track once per rate.
+    """
+    if sampling is not None:
+        y, sr = _load_sf(audio_path)
+        return y, sr, pick_windows_from_array(y, sr, sampling, audio_path)
+    y, sr = _load_sf(audio_path, duration_s)
+    return y, sr, _default_windows(y, sr)
+
+
+def _sampling_segments(audio_path: str, params: SamplingParams) -> tuple[list[np.ndarray], int]:
+    """Decode the track once, pick sampling windows from it, and slice them (no model work)."""
+    y, sr, windows = _decode_track(audio_path, 0, params)
+    return _window_slices(y, sr, windows) or [y], sr
+
 
 def embed_with_sampling(audio_path: str, embedder: MertEmbedder, params: SamplingParams) -> np.ndarray:
     """Embed multiple segments chosen by sampling profile and average them."""
-    y, sr = librosa.load(audio_path, sr=None, mono=True)
-    segments = pick_windows(y, sr, params)
-    embs: list[np.ndarray] = []
-    for start, end in segments:
-        s = int(start * sr)
-        e = int(end * sr)
-        if s >= e or s >= y.shape[0]:
-            continue
-        seg = y[s:e]
-        embs.append(embedder.encode_array(seg, sr))
-    if not embs:
-        return embedder.encode_array(y, sr)
-    return np.mean(np.stack(embs, axis=0), axis=0)
+    segments, sr = _sampling_segments(audio_path, params)
+    embs = embedder.encode_batch([(seg, sr) for seg in segments])
+    return _mean_vecs(embs)
 
 
 def _window_slices(y: np.ndarray, sr: int, windows: list[tuple[float, float]]) -> list[np.ndarray]:
     slices: list[np.ndarray] = []
     n = y.shape[0]
     for start_s, end_s in windows:
-        s = int(start_s * sr)
+        s = max(int(start_s * sr), 0)
         e = int(end_s * sr)
         if s >= e or s >= n:
             continue
@@ -170,16 +681,13 @@ def timbre_embedding_from_windows(
       - If multiple windows are provided (intro/core/late), only the first and
         last are used (typically intro and late).
       - Frames use a larger hop (75% of frame length) compared to MERT’s
-        coverage, which cuts the number of OpenL3 calls by ~50%.
+        coverage, which cuts the number of frames by ~50%.
+      - All frames of a window go to OpenL3 in a single batched call.
     """
     if openl3 is None:
         return None
     if y.ndim != 1:
         y = librosa.to_mono(y)
-    # resample once for timbre
-    if sr != TIMBRE_SR:
-        y = librosa.resample(y, orig_sr=sr, target_sr=TIMBRE_SR)
-        sr = TIMBRE_SR
 
     # Focus timbre on intro + late to reduce work while still sampling texture
     selected_windows: list[tuple[float, float]]
@@ -189,59 +697,147 @@ def timbre_embedding_from_windows(
         selected_windows = windows
 
     win_vecs: list[np.ndarray] = []
-    for start_s, end_s in selected_windows:
-        s = int(start_s * sr)
-        e = int(end_s * sr)
-        if s >= e or s >= y.shape[0]:
-            continue
-        e = min(e, y.shape[0])
-        seg = y[s:e]
+    for seg in _window_slices(y, sr, selected_windows):
+        # resample only the selected windows, not the whole track
+        if sr != TIMBRE_SR:
+            seg = librosa.resample(seg, orig_sr=sr, target_sr=TIMBRE_SR)
         if seg.size == 0:
             continue
-        frame_len = int(TIMBRE_FRAME_S * sr)
+        frame_len = int(TIMBRE_FRAME_S * TIMBRE_SR)
         # Use a larger hop (e.g., 75% of frame length) to reduce frame count.
         hop = max(1, int(frame_len * 0.75))
-        embs: list[np.ndarray] = []
-        for i in range(0, max(len(seg) - frame_len, 1), hop):
-            frame = seg[i : i + frame_len]
-            if frame.size < frame_len:
-                pad = np.zeros(frame_len - frame.size, dtype=seg.dtype)
-                frame = np.concatenate([frame, pad])
-            try:
-                ev = timbre_emb.encode_array(frame, sr)
-                if ev is None:
-                    continue
-                if ev.ndim > 1:
-                    embs.append(np.mean(ev, axis=0))
-                else:
-                    embs.append(ev)
-            except Exception:
-                continue
-
-        if not embs:
+        # Frame starts cover [0, len - frame_len), so every frame is already full
+        # length; only a window shorter than one frame needs (one) pad.
+        if seg.size < frame_len:
+            seg = np.pad(seg, (0, frame_len - seg.size))
+        # Strided view over the window: [F, frame_len] without copying any samples.
+        frames = sliding_window_view(seg, frame_len)[: max(len(seg) - frame_len, 1) : hop]
+        try:
+            embs = timbre_emb.encode_batch(frames, TIMBRE_SR)
+        except Exception:
             continue
-        m = np.mean(np.stack(embs, axis=0), axis=0)
-        v = np.var(np.stack(embs, axis=0), axis=0)
+        if not len(embs):
+            continue
+        m, v = _mean_var(embs)
         win_vec = np.concatenate([m, v]).astype(np.float32)
         win_vecs.append(win_vec)
 
     if not win_vecs:
         return None
-    return np.mean(np.stack(win_vecs, axis=0), axis=0)
+    return _mean_vecs(win_vecs)
 
 
 ProgressCallback = Callable[[int, int, str], None]
 
 
-def _first_non_silent_time(y: np.ndarray, sr: int, threshold: float = 1e-4) -> float:
-    """Return the time (s) of the first sample above a small energy threshold."""
+def _write_npy(out: pathlib.Path, vec: np.ndarray) -> None:
+    try:
+        # Same bytes as np.save, minus its path/pickle handling per call.
+        with open(out, "wb") as f:
+            np.lib.format.write_array(f, np.ascontiguousarray(vec), version=(1, 0), allow_pickle=False)
+    except Exception as e:
+        console.print(f"[red]Failed to write embedding {out}: {e!r}")
+
+
+def _shard_header(shape: tuple[int, int], dtype=np.float16) -> bytes:
+    """.npy v1.0 header padded so the array data starts on a SHARD_ALIGN boundary."""
+    header = repr({"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": shape})
+    prefix = np.lib.format.magic(1, 0)
+    pad = -(len(prefix) + 2 + len(header) + 1) % SHARD_ALIGN
+    header = header + " " * pad + "\n"
+    return prefix + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class EmbeddingShard:
+    """Fixed-width fp16 embedding matrix in a single .npy file; each track owns a row.
+
+    The data section is 256-byte aligned, so readers can use
+    ``np.load(path, mmap_mode="r")[row]`` without copying. Only the first
+    ``rows`` rows are in use; the rest is preallocated room to grow.
+    """
+
+    def __init__(self, path: pathlib.Path, dim: int, rows: int = 0):
+        self.path = pathlib.Path(path)
+        self.dim = int(dim)
+        self.rows = int(rows)
+        self._mm: np.memmap | None = None
+        self._dirty = 0
+        if self.path.exists():
+            try:
+                mm = np.load(self.path, mmap_mode="r+")
+                if mm.ndim == 2 and mm.shape[1] == self.dim and mm.shape[0] >= self.rows:
+                    self._mm = mm
+            except Exception:
+                self._mm = None
+        if self._mm is None:
+            self.rows = 0
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self._mm is None else int(self._mm.shape[0])
+
+    def reserve(self, extra: int) -> None:
+        """Make room for `extra` more rows, copying existing rows into a larger file."""
+        need = self.rows + max(0, int(extra))
+        if need <= self.capacity and self._mm is not None:
+            return
+        cap = max(need, 2 * self.capacity, 1)
+        tmp = self.path.with_suffix(".tmp")
+        header = _shard_header((cap, self.dim))
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.truncate(len(header) + cap * self.dim * 2)
+        mm = np.memmap(tmp, dtype=np.float16, mode="r+", offset=len(header), shape=(cap, self.dim))
+        if self._mm is not None and self.rows:
+            mm[: self.rows] = self._mm[: self.rows]
+        mm.flush()
+        self._mm = None
+        del mm
+        os.replace(tmp, self.path)
+        self._mm = np.load(self.path, mmap_mode="r+")
+
+    def write(self, row: int | None, vec: np.ndarray) -> int:
+        """Store vec at row (or append when row is None/out of range); returns the row."""
+        if row is None or not 0 <= row < self.rows:
+            self.reserve(1)
+            row = self.rows
+            self.rows += 1
+        self._mm[row] = vec
+        self._dirty += 1
+        if self._dirty >= SHARD_FLUSH_EVERY:
+            self.flush()
+        return row
+
+    def read(self, row: int) -> np.ndarray:
+        return np.array(self._mm[row])
+
+    def flush(self) -> None:
+        if self._mm is not None and self._dirty:
+            self._mm.flush()
+        self._dirty = 0
+
+
+def _first_non_silent_time(
+    y: np.ndarray,
+    sr: int,
+    threshold: float = 1e-4,
+    max_scan_s: float = 30.0,
+) -> float:
+    """Return the time (s) of the first sample above a small energy threshold.
+
+    Only the first max_scan_s seconds are searched; a track that is silent
+    for longer than that is treated as starting at 0.
+    """
     if y.size == 0 or sr <= 0:
         return 0.0
-    amp = np.abs(y)
-    idx = np.argmax(amp > threshold)
-    if amp[idx] <= threshold:
-        return 0.0
-    return float(idx) / float(sr)
+    n = min(y.size, int(max_scan_s * sr))
+    # Scan in blocks and stop at the first hit; usually only the first block is touched.
+    block = 1 << 16
+    for start in range(0, n, block):
+        hits = np.flatnonzero(np.abs(y[start : min(start + block, n)]) > threshold)
+        if hits.size:
+            return float(start + hits[0]) / float(sr)
+    return 0.0
 
 
 def _clamp(value: float, lo: float, hi: float) -> float:
@@ -311,10 +907,54 @@ def embed_with_default_windows(
     slices = _window_slices(y, sr, windows)
     if not slices:
         return embedder.encode_array(y, sr)
-    embs: list[np.ndarray] = []
-    for seg in slices:
-        embs.append(embedder.encode_array(seg, sr))
-    return np.mean(np.stack(embs, axis=0), axis=0)
+    embs = embedder.encode_batch([(seg, sr) for seg in slices])
+    return _mean_vecs(embs)
+
+
+class _MertBatchCollector:
+    """Buffers the windows of several tracks and embeds them in one encode_batch call.
+
+    encode_batch groups windows by bucket, so e.g. every 10 s intro in the
+    batch shares one padded forward. Each track's window vectors are averaged
+    and handed to on_done(key, vec); if the batch fails, on_error(key, exc)
+    is called for each of its tracks.
+    """
+
+    def __init__(
+        self,
+        embedder: MertEmbedder,
+        max_tracks: int,
+        on_done: Callable[[object, np.ndarray], None],
+        on_error: Callable[[object, Exception], None],
+    ):
+        self.embedder = embedder
+        self.max_tracks = max(1, int(max_tracks))
+        self._on_done = on_done
+        self._on_error = on_error
+        self._pending: list[tuple[object, list[np.ndarray], int]] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, key: object, segments: list[np.ndarray], sr: int) -> None:
+        self._pending.append((key, segments, sr))
+        if len(self._pending) >= self.max_tracks:
+            self.flush()
+
+    def flush(self) -> None:
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            vecs = self.embedder.encode_batch([(seg, sr) for _, segs, sr in pending for seg in segs])
+        except Exception as e:
+            for key, _, _ in pending:
+                self._on_error(key, e)
+            return
+        pos = 0
+        for key, segs, _ in pending:
+            self._on_done(key, _mean_vecs(vecs[pos : pos + len(segs)]))
+            pos += len(segs)
 
 
 def build_embeddings(
@@ -329,9 +969,19 @@ def build_embeddings(
     batch_size: Optional[int] = None,
     timbre: bool = False,
     timbre_size: int = 512,
+    decode_processes: bool = False,
+    precision: str = "auto",
 ) -> None:
+    """Embed `paths` into EMB and record them in meta.
+
+    `num_workers` loader threads decode ahead of inference. With
+    `decode_processes`, the decode and windowing itself runs in a process pool
+    of the same size, for formats whose decoders hold the GIL (audioread/MP3
+    fallbacks); the threads then only pin and queue the result. `precision`
+    is passed to MertEmbedder (auto | bf16 | fp16 | fp32).
+    """
     meta = load_meta()
-    emb = MertEmbedder(model_name=model_name, device=device)
+    emb = MertEmbedder(model_name=model_name, device=device, precision=precision)
     timbre_emb: TimbreEmbedder | None = None
     if timbre:
         try:
@@ -342,9 +992,58 @@ def build_embeddings(
     EMB.mkdir(parents=True, exist_ok=True)
     total = len(paths)
 
-    if sampling is not None and num_workers > 0:
-        # Keep sampling runs serial to avoid repeated disk reads per segment per worker.
-        num_workers = 0
+    # kind -> {"path", "rows", "dim"} for the component embedding shards
+    shard_state: dict[str, dict] = meta.setdefault("shards", {})
+    shards: dict[str, EmbeddingShard] = {}
+
+    def _shard(kind: str, dim: int, reserve: int = 1) -> EmbeddingShard:
+        shard = shards.get(kind)
+        if shard is None:
+            state = shard_state.get(kind) or {}
+            rows = int(state.get("rows", 0)) if state.get("dim") == dim else 0
+            shard = EmbeddingShard(EMB / f"_{kind}_shard.npy", dim, rows)
+            if shard.rows == 0:
+                # Old rows are gone (new file or different width); forget them.
+                for info in meta.get("tracks", {}).values():
+                    info.pop(f"{kind}_row", None)
+            shard.reserve(reserve)
+            shards[kind] = shard
+        return shard
+
+    # content fingerprint -> track path whose embeddings were computed from that content
+    fingerprints: dict[str, str] = meta.setdefault("fingerprints", {})
+    track_fp: dict[str, str] = {}
+    reused = 0
+
+    def _reuse_duplicate(src: str, dst: str) -> bool:
+        """Copy a duplicate's embedding files to dst instead of re-running inference."""
+        src_info = meta.get("tracks", {}).get(src) or {}
+        if not src_info.get("embedding") or not pathlib.Path(src_info["embedding"]).exists():
+            return False
+        info = meta["tracks"].setdefault(dst, {})
+        stem = pathlib.Path(dst).stem
+        for kind in SHARD_KINDS:
+            src_row = src_info.get(f"{kind}_row")
+            state = shard_state.get(kind)
+            if src_row is None or not state:
+                continue
+            shard = _shard(kind, int(state["dim"]), reserve=len(paths))
+            if src_row < shard.rows:
+                info[f"{kind}_row"] = shard.write(info.get(f"{kind}_row"), shard.read(src_row))
+                shard_state[kind] = {"path": str(shard.path), "rows": shard.rows, "dim": shard.dim}
+        for kind in ("embedding", "embedding_mert", "embedding_timbre"):
+            epath = src_info.get(kind)
+            if not epath or not pathlib.Path(epath).exists():
+                continue
+            suffix = "" if kind == "embedding" else f"_{kind}"
+            out = EMB / (stem + f"{suffix}.npy")
+            if pathlib.Path(epath).resolve() != out.resolve():
+                shutil.copyfile(epath, out)
+            info[kind] = str(out)
+        info.setdefault("artist", stem.split(" - ")[0] if " - " in stem else "")
+        info.setdefault("title", stem.split(" - ")[-1])
+        info["embedding_source"] = src_info.get("embedding_source", "baseline")
+        return True
 
     # Resolve source paths (respect folder mode/stems) before optional parallel load
     jobs: list[tuple[str, str, str]] = []  # (original_path, src_for_embed, used_label)
@@ -353,6 +1052,19 @@ def build_embeddings(
             info = meta.get("tracks", {}).get(p)
             if info and info.get("embedding") and pathlib.Path(info["embedding"]).exists():
                 continue
+            # fingerprint only tracks that still need an embedding (reads 1 MB each)
+            try:
+                track_fp[p] = file_sig_head(p)
+            except Exception:
+                pass
+            dup = fingerprints.get(track_fp.get(p, ""))
+            if dup and dup != p:
+                try:
+                    if _reuse_duplicate(dup, p):
+                        reused += 1
+                        continue
+                except Exception as e:
+                    console.print(f"[yellow]Duplicate reuse failed for {p}: {e}")
         src_path = p
         used = "baseline"
         try:
@@ -369,22 +1081,28 @@ def build_embeddings(
         except Exception as e:
             console.print(f"[yellow]Mode check failed for {p}: {e}")
         jobs.append((p, src_path, used))
+    if reused:
+        console.print(f"[green]Reused embeddings for {reused} duplicate track(s).")
 
-    def _load(audio_path: str) -> tuple[np.ndarray, int]:
-        y, sr = librosa.load(audio_path, sr=None, mono=True)
-        if duration_s and y.shape[0] > sr * duration_s:
-            y = y[: sr * duration_s]
-        return y, sr
+    decode_pool: ProcessPoolExecutor | None = None
+
+    def _load_job(audio_path: str):
+        """Decode, cut windows and pin them; runs on loader threads."""
+        if decode_pool is not None:
+            y, sr, windows = decode_pool.submit(_decode_track, audio_path, duration_s, sampling).result()
+        else:
+            y, sr, windows = _decode_track(audio_path, duration_s, sampling)
+        segments = _window_slices(y, sr, windows) or [y]
+        track = None if sampling is not None else (y, sr, windows)
+        return [emb.stage(seg) for seg in segments], sr, track
 
     progress: Progress | None = None
     task_id: int | None = None
+    # Single background writer so .npy writes overlap with the next inference.
+    writer = ThreadPoolExecutor(max_workers=1)
     try:
-        effective_batch = 1
-        if sampling is not None:
-            # Sampling path performs its own per-segment embedding; keep serial.
-            effective_batch = 1
-        else:
-            effective_batch = 4 if emb.device != "cpu" else 1
+        # Tracks whose windows share one MERT call (see _MertBatchCollector).
+        effective_batch = 4 if emb.device != "cpu" else 1
         batch_size = effective_batch if batch_size is None else max(1, int(batch_size))
 
         if progress_callback is None:
@@ -397,116 +1115,180 @@ def build_embeddings(
                 progress.advance(task_id)
 
         def _save_embedding(orig: str, vec: np.ndarray, used: str, kind: str = "embedding") -> None:
-            suffix = "" if kind == "embedding" else f"_{kind}"
-            out = EMB / (pathlib.Path(orig).stem + f"{suffix}.npy")
-            vec_fp16 = vec.astype(np.float16)
-            np.save(out, vec_fp16)
             info = meta["tracks"].setdefault(orig, {})
             info.setdefault("artist", pathlib.Path(orig).stem.split(" - ")[0] if " - " in pathlib.Path(orig).stem else "")
             info.setdefault("title", pathlib.Path(orig).stem.split(" - ")[-1])
+            vec_fp16 = np.asarray(vec, dtype=np.float16)  # no copy when already fp16
+            try:
+                shard = _shard(kind, vec_fp16.shape[-1], reserve=len(jobs))
+                info[f"{kind}_row"] = shard.write(info.get(f"{kind}_row"), vec_fp16)
+                shard_state[kind] = {"path": str(shard.path), "rows": shard.rows, "dim": shard.dim}
+            except OSError as e:
+                # Shard locked/unwritable (e.g. open in another process on Windows):
+                # fall back to the per-track .npy below.
+                console.print(f"[yellow]{kind} shard unavailable, writing .npy: {e}")
+                info.pop(f"{kind}_row", None)
+            else:
+                if kind != "embedding":
+                    old = info.pop(kind, None)  # per-track component file from older runs
+                    if old:
+                        pathlib.Path(old).unlink(missing_ok=True)
+                    return
+            # The combined vector also keeps its .npy; most readers still load it by path.
+            suffix = "" if kind == "embedding" else f"_{kind}"
+            out = EMB / (pathlib.Path(orig).stem + f"{suffix}.npy")
+            writer.submit(_write_npy, out, vec_fp16)
             info[kind] = str(out)
             if kind == "embedding":
                 info["embedding_source"] = used
+                fp = track_fp.get(orig)
+                if fp is None:
+                    try:
+                        fp = file_sig_head(orig)
+                    except Exception:
+                        fp = None
+                if fp:
+                    fingerprints[fp] = orig
 
-        # Parallelize I/O + decode; keep model inference batched to reduce GPU overhead
+        # Decode runs on loader threads while the main thread runs inference.
         workers = max(0, int(num_workers))
         done = 0
-        def _process_one(orig: str, src_path: str, y: np.ndarray, sr: int, used: str) -> None:
+
+        def _advance(orig: str) -> None:
             nonlocal done
+            done += 1
+            if progress_callback is not None:
+                progress_callback(done, total, orig)
+            else:
+                _tick()
+
+        def _report_failure(orig: str, e: Exception) -> None:
+            # Per-file failures should never crash the whole job; some file
+            # paths may also contain characters that the Windows console
+            # cannot encode. Fall back to a safe representation.
             try:
-                windows: list[tuple[float, float]] = _default_windows(y, sr)
-                mert_vec: np.ndarray | None = None
-                timbre_vec: np.ndarray | None = None
-                if sampling is not None:
-                    vec = embed_with_sampling(src_path, emb, sampling)
-                    mert_vec = vec
+                console.print(f"[red]Embedding failed for {orig}: {e!r}")
+            except Exception:
+                safe_path = repr(str(orig))
+                console.print(f"[red]Embedding failed for {safe_path}: {e!r}")
+
+        def _finish_default(orig: str, used: str, y: np.ndarray, sr: int, windows, mert_vec: np.ndarray) -> None:
+            timbre_vec: np.ndarray | None = None
+            _save_embedding(orig, mert_vec, used, kind="embedding_mert")
+
+            if timbre_emb is not None:
+                try:
+                    timbre_vec = timbre_embedding_from_windows(y, sr, windows, timbre_emb)
+                    if timbre_vec is not None:
+                        _save_embedding(orig, timbre_vec, used, kind="embedding_timbre")
+                except Exception as te:
+                    console.print(f"[yellow]Timbre embed failed for {orig}: {te}")
+
+            combined = mert_vec
+            source_label = used
+            if timbre_vec is not None:
+                if combined is not None and combined.shape == timbre_vec.shape:
+                    # Mix in fp32; _save_embedding casts the result to fp16 once.
+                    combined = W_MERT * combined.astype(np.float32) + W_TIMBRE * timbre_vec.astype(np.float32)
+                    source_label = f"{used}+timbre({W_MERT:.2f}/{W_TIMBRE:.2f})"
                 else:
-                    vec = embed_with_default_windows(y, sr, emb, windows=windows)
-                    mert_vec = vec
-                _save_embedding(orig, vec, used, kind="embedding_mert")
+                    combined = timbre_vec
+                    source_label = "timbre_only"
 
-                if timbre_emb is not None:
-                    try:
-                        timbre_vec = timbre_embedding_from_windows(y, sr, windows, timbre_emb)
-                        if timbre_vec is not None:
-                            _save_embedding(orig, timbre_vec, used, kind="embedding_timbre")
-                    except Exception as te:
-                        console.print(f"[yellow]Timbre embed failed for {orig}: {te}")
-
-                combined = mert_vec
-                source_label = used
-                if timbre_vec is not None:
-                    if combined is not None and combined.shape == timbre_vec.shape:
-                        combined = (W_MERT * combined) + (W_TIMBRE * timbre_vec)
-                        source_label = f"{used}+timbre({W_MERT:.2f}/{W_TIMBRE:.2f})"
-                    else:
-                        combined = timbre_vec
-                        source_label = "timbre_only"
-
-                if combined is not None:
-                    _save_embedding(orig, combined, source_label, kind="embedding")
+            if combined is not None:
+                _save_embedding(orig, combined, source_label, kind="embedding")
+
+        def _on_embedded(key, vec: np.ndarray) -> None:
+            orig, used, track = key
+            try:
+                if track is None:  # sampling: only the combined embedding is stored
+                    _save_embedding(orig, vec, used)
+                else:
+                    _finish_default(orig, used, *track, vec)
             except Exception as e:
-                # Per-file failures should never crash the whole job; some file
-                # paths may also contain characters that the Windows console
-                # cannot encode. Fall back to a safe representation.
-                try:
-                    console.print(f"[red]Embedding failed for {orig}: {e!r}")
-                except Exception:
-                    safe_path = repr(str(orig))
-                    console.print(f"[red]Embedding failed for {safe_path}: {e!r}")
+                _report_failure(orig, e)
             finally:
-                done += 1
-                if progress_callback is not None:
-                    progress_callback(done, total, orig)
-                else:
-                    _tick()
+                _advance(orig)
+
+        def _on_failed(key, e: Exception) -> None:
+            _report_failure(key[0], e)
+            _advance(key[0])
+
+        collector = _MertBatchCollector(emb, batch_size, _on_embedded, _on_failed)
+
+        # Loader threads take jobs from a shared deque and push decoded audio into
+        # a bounded queue; the main thread embeds whatever is ready first. A full
+        # queue blocks the loaders, so at most 2 * loaders decoded tracks wait in
+        # memory, and one slow decode never stalls tracks that are already loaded.
+        n_loaders = max(1, workers)
+        if decode_processes and workers > 0:
+            # spawn, not fork: this process already runs loader threads and CUDA.
+            decode_pool = ProcessPoolExecutor(max_workers=n_loaders, mp_context=multiprocessing.get_context("spawn"))
+        ready: queue.Queue = queue.Queue(maxsize=2 * n_loaders)
+        todo = deque(jobs)
+        todo_lock = threading.Lock()
+        stop = threading.Event()
+
+        def _put(item) -> None:
+            while not stop.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
 
-        if workers > 0:
-            with ThreadPoolExecutor(max_workers=workers) as ex:
-                future_map = {ex.submit(_load, src): (orig, src, used) for (orig, src, used) in jobs}
-                for fut in as_completed(future_map):
-                    orig, src_path, used = future_map[fut]
+        def _loader() -> None:
+            try:
+                while not stop.is_set():
+                    with todo_lock:
+                        if not todo:
+                            return
+                        job = todo.popleft()
                     try:
-                        y, sr = fut.result()
-                        _process_one(orig, src_path, y, sr, used)
+                        _put((job, _load_job(job[1]), None))
                     except Exception as e:
-                        try:
-                            console.print(f"[red]Embedding failed for {orig}: {e!r}")
-                        except Exception:
-                            safe_path = repr(str(orig))
-                            console.print(f"[red]Embedding failed for {safe_path}: {e!r}")
-                        done += 1
-                        if progress_callback is not None:
-                            progress_callback(done, total, orig)
-                        else:
-                            _tick()
-        else:
-            for orig, src, used in jobs:
+                        _put((job, None, e))
+            finally:
+                _put(None)  # sentinel: this loader is done
+
+        loaders = [threading.Thread(target=_loader, daemon=True) for _ in range(n_loaders)]
+        for t in loaders:
+            t.start()
+        try:
+            finished = 0
+            while finished < n_loaders:
                 try:
-                    if sampling is not None:
-                        vec = embed_with_sampling(src, emb, sampling)
-                        _save_embedding(orig, vec, used)
-                        done += 1
-                        if progress_callback is not None:
-                            progress_callback(done, total, orig)
-                        else:
-                            _tick()
-                        continue
-                    y, sr = _load(src)
-                    _process_one(orig, src, y, sr, used)
+                    # Don't let buffered tracks wait on a slow decode: flush when idle.
+                    item = ready.get(timeout=0.05) if len(collector) else ready.get()
+                except queue.Empty:
+                    collector.flush()
+                    continue
+                if item is None:
+                    finished += 1
+                    continue
+                (orig, src_path, used), loaded, err = item
+                try:
+                    if err is not None:
+                        raise err
+                    segments, sr, track = loaded
+                    collector.add((orig, used, track), segments, sr)
                 except Exception as e:
-                    try:
-                        console.print(f"[red]Embedding failed for {orig}: {e!r}")
-                    except Exception:
-                        safe_path = repr(str(orig))
-                        console.print(f"[red]Embedding failed for {safe_path}: {e!r}")
-                    done += 1
-                    if progress_callback is not None:
-                        progress_callback(done, total, orig)
-                    else:
-                        _tick()
+                    _report_failure(orig, e)
+                    _advance(orig)
+            collector.flush()
+        finally:
+            stop.set()
 
+        # Every .npy must be on disk before meta.json references it.
+        writer.shutdown(wait=True)
+        for shard in shards.values():
+            shard.flush()
         save_meta(meta)
     finally:
+        writer.shutdown(wait=True)
+        if decode_pool is not None:
+            decode_pool.shutdown(wait=True, cancel_futures=True)
+        for shard in shards.values():
+            shard.flush()
         if progress is not None:
             progress.stop()
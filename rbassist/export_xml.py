@@ -4,18 +4,17 @@ from typing import Optional
 from xml.etree.ElementTree import Element, SubElement, ElementTree
 from .versions import __version__
 
+try:
+    from lxml import etree as lxml_etree  # type: ignore
+except Exception:
+    lxml_etree = None  # type: ignore
+
 def _as_location_uri(path: str) -> str:
     p = pathlib.Path(path).resolve()
     return "file://localhost/" + urllib.parse.quote(p.as_posix())
 
-def write_rekordbox_xml(meta: dict, out_path: str, playlist_name: Optional[str] = None) -> None:
-    root = Element("DJ_PLAYLISTS", Version="1.0.0")
-    SubElement(root, "PRODUCT", Name="rbassist", Version=__version__, Company="You")
-
-    tracks = meta.get("tracks", {})
-    coll = SubElement(root, "COLLECTION", Entries=str(len(tracks)))
-
-    # Build global MyTag registry once so we can emit consistent IDs
+def _collect_tag_ids(tracks: dict) -> dict[str, str]:
+    """Global MyTag registry so every track emits consistent IDs."""
     all_tags = sorted(
         {
             tag
@@ -24,50 +23,99 @@ def write_rekordbox_xml(meta: dict, out_path: str, playlist_name: Optional[str]
             if isinstance(tag, str) and tag.strip()
         }
     )
-    tag_ids = {tag: str(idx) for idx, tag in enumerate(all_tags, start=1)}
+    return {tag: str(idx) for idx, tag in enumerate(all_tags, start=1)}
+
+
+def _track_element(make, sub, i: int, location: str, info: dict, tag_ids: dict[str, str]):
+    """Build one COLLECTION/TRACK node with `make`/`sub` (ElementTree or lxml factories)."""
+    t = make("TRACK", TrackID=str(i))
+    t.set("Name", info.get("title",""))
+    t.set("Artist", info.get("artist",""))
+    if info.get("genre"): t.set("Genre", info.get("genre"))
+    if info.get("grouping"): t.set("Grouping", info.get("grouping"))
+    if info.get("comments"): t.set("Comments", info.get("comments"))
+    if info.get("key"): t.set("Tonality", info.get("key"))
+    if info.get("bpm"): t.set("AverageBpm", f"{float(info['bpm']):.2f}")
+    t.set("Location", location)
+
+    # Beatgrid segments
+    tempos = info.get("tempos")
+    if not tempos and info.get("bpm"):
+        tempos = [{"inizio_sec": 0.0, "bpm": float(info["bpm"]), "metro": "4/4", "battito": 1}]
+    for seg in tempos or []:
+        sub(t, "TEMPO",
+            Inizio=f"{float(seg.get('inizio_sec',0.0)):.3f}",
+            Bpm=f"{float(seg.get('bpm',0.0)):.2f}",
+            Metro=seg.get("metro","4/4"),
+            Battito=str(int(seg.get("battito",1)))
+        )
+
+    # Cues/loops
+    for c in info.get("cues", []):
+        sub(t, "POSITION_MARK",
+            Name=c.get("name",""),
+            Type=str(int(c.get("type",0))),
+            Start=f"{float(c.get('start',0.0)):.3f}",
+            End=f"{float(c.get('end',0.0)):.3f}",
+            Num=str(int(c.get("num",-1)))
+        )
+
+    mytags = [m for m in info.get("mytags", []) if m in tag_ids]
+    if mytags:
+        mytag_node = sub(t, "MY_TAG")
+        for tag in mytags:
+            sub(mytag_node, "TAG", ID=tag_ids[tag], Name=tag)
+    return t
+
+
+def _write_streaming(meta: dict, out_path: str, playlist_name: Optional[str]) -> None:
+    """lxml incremental writer: serializes one TRACK at a time instead of a full DOM."""
+    E = lxml_etree
+    tracks = meta.get("tracks", {})
+    uri_cache = {p: _as_location_uri(p) for p in tracks}
+    tag_ids = _collect_tag_ids(tracks)
+    with E.xmlfile(out_path, encoding="UTF-8") as xf:
+        xf.write_declaration()
+        with xf.element("DJ_PLAYLISTS", Version="1.0.0"):
+            xf.write(E.Element("PRODUCT", Name="rbassist", Version=__version__, Company="You"))
+            with xf.element("COLLECTION", Entries=str(len(tracks))):
+                for i, (path, info) in enumerate(tracks.items(), start=1):
+                    xf.write(_track_element(E.Element, E.SubElement, i, uri_cache[path], info, tag_ids))
+            if tag_ids:
+                with xf.element("MY_TAGS"):
+                    for tag, tag_id in tag_ids.items():
+                        xf.write(E.Element("TAG", ID=tag_id, Name=tag))
+
+            # Optional playlist keyed by Location
+            with xf.element("PLAYLISTS"):
+                with xf.element("NODE", Type="0", Name="ROOT", Count="1" if playlist_name else "0"):
+                    if playlist_name:
+                        with xf.element("NODE", Type="1", Name=playlist_name, Entries=str(len(tracks)), KeyType="1"):
+                            for path in tracks.keys():
+                                xf.write(E.Element("TRACK", Key=uri_cache[path]))
+
+
+def write_rekordbox_xml(meta: dict, out_path: str, playlist_name: Optional[str] = None) -> None:
+    if lxml_etree is not None:
+        _write_streaming(meta, out_path, playlist_name)
+        return
+
+    root = Element("DJ_PLAYLISTS", Version="1.0.0")
+    SubElement(root, "PRODUCT", Name="rbassist", Version=__version__, Company="You")
+
+    tracks = meta.get("tracks", {})
+    # resolve() stats every path component; do it once per track, not per reference
+    uri_cache = {p: _as_location_uri(p) for p in tracks}
+    coll = SubElement(root, "COLLECTION", Entries=str(len(tracks)))
+
+    tag_ids = _collect_tag_ids(tracks)
     if tag_ids:
         tag_root = SubElement(root, "MY_TAGS")
         for tag, tag_id in tag_ids.items():
             SubElement(tag_root, "TAG", ID=tag_id, Name=tag)
 
     for i, (path, info) in enumerate(tracks.items(), start=1):
-        t = SubElement(coll, "TRACK", TrackID=str(i))
-        t.set("Name", info.get("title",""))
-        t.set("Artist", info.get("artist",""))
-        if info.get("genre"): t.set("Genre", info.get("genre"))
-        if info.get("grouping"): t.set("Grouping", info.get("grouping"))
-        if info.get("comments"): t.set("Comments", info.get("comments"))
-        if info.get("key"): t.set("Tonality", info.get("key"))
-        if info.get("bpm"): t.set("AverageBpm", f"{float(info['bpm']):.2f}")
-        t.set("Location", _as_location_uri(path))
-
-        # Beatgrid segments
-        tempos = info.get("tempos")
-        if not tempos and info.get("bpm"):
-            tempos = [{"inizio_sec": 0.0, "bpm": float(info["bpm"]), "metro": "4/4", "battito": 1}]
-        for seg in tempos or []:
-            SubElement(t, "TEMPO",
-                Inizio=f"{float(seg.get('inizio_sec',0.0)):.3f}",
-                Bpm=f"{float(seg.get('bpm',0.0)):.2f}",
-                Metro=seg.get("metro","4/4"),
-                Battito=str(int(seg.get("battito",1)))
-            )
-
-        # Cues/loops
-        for c in info.get("cues", []):
-            SubElement(t, "POSITION_MARK",
-                Name=c.get("name",""),
-                Type=str(int(c.get("type",0))),
-                Start=f"{float(c.get('start',0.0)):.3f}",
-                End=f"{float(c.get('end',0.0)):.3f}",
-                Num=str(int(c.get("num",-1)))
-            )
-
-        mytags = [m for m in info.get("mytags", []) if m in tag_ids]
-        if mytags:
-            mytag_node = SubElement(t, "MY_TAG")
-            for tag in mytags:
-                SubElement(mytag_node, "TAG", ID=tag_ids[tag], Name=tag)
+        coll.append(_track_element(Element, SubElement, i, uri_cache[path], info, tag_ids))
 
     # Optional playlist keyed by Location
     pls = SubElement(root, "PLAYLISTS")
@@ -75,7 +123,7 @@ def write_rekordbox_xml(meta: dict, out_path: str, playlist_name: Optional[str]
     if playlist_name:
         pnode = SubElement(rootnode, "NODE", Type="1", Name=playlist_name, Entries=str(len(tracks)), KeyType="1")
         for path in tracks.keys():
-            SubElement(pnode, "TRACK", Key=_as_location_uri(path))
+            SubElement(pnode, "TRACK", Key=uri_cache[path])
         rootnode.set("Count", "1")
 
     ElementTree(root).write(out_path, encoding="UTF-8", xml_declaration=True)
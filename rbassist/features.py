@@ -2,30 +2,129 @@ from __future__ import annotations
 
 import numpy as np
 import librosa
+from functools import lru_cache
+from numba import njit
+from scipy.ndimage import median_filter
 from typing import Tuple
 
+from ._dtw import dtw_band, dtw_band_many
+
+# Sakoe-Chiba band for contour DTW, as a fraction of the contour length.
+DTW_BAND = 0.1
+
+
+@lru_cache(maxsize=32)
+def _freqs(sr: int, n_bins: int) -> np.ndarray:
+    """STFT bin centre frequencies; shared and read-only, copy before mutating."""
+    freqs = np.linspace(0, sr / 2, n_bins)
+    freqs.flags.writeable = False
+    return freqs
+
+
+@lru_cache(maxsize=32)
+def _band_slice(sr: int, n_bins: int, fmin: float, fmax: float) -> slice:
+    """Rows with fmin <= freq <= fmax. Bin frequencies are sorted, so the band is contiguous."""
+    freqs = _freqs(sr, n_bins)
+    lo = int(np.searchsorted(freqs, fmin))
+    hi = int(np.searchsorted(freqs, fmax, side="right"))
+    return slice(lo, hi)
+
 
 def _stft_bandpass(S: np.ndarray, sr: int, hop: int, fmin: float, fmax: float) -> np.ndarray:
-    freqs = np.linspace(0, sr / 2, S.shape[0])
-    mask = (freqs >= fmin) & (freqs <= fmax)
-    return S[mask, :]
+    # A basic slice is a view, not a gathered copy; librosa's STFT is F-ordered,
+    # so each frame's band rows stay contiguous for the per-frame reductions.
+    return S[_band_slice(sr, S.shape[0], fmin, fmax), :]
+
 
+def _stft_mag_torch(y, n_fft: int, hop: int, device: str):
+    """|STFT| on `device` via torch.stft, framed like librosa.stft (periodic Hann, zero-padded centering)."""
+    import torch
 
-def samples_score(y: np.ndarray, sr: int) -> float:
-    """Heuristic score in [0,1] for presence of midrange 'samples' around break sections."""
+    x = torch.as_tensor(y, dtype=torch.float32).to(device)
+    S = torch.stft(
+        x,
+        n_fft=n_fft,
+        hop_length=hop,
+        window=torch.hann_window(n_fft, device=x.device),
+        center=True,
+        pad_mode="constant",
+        return_complex=True,
+    )
+    return S.abs()
+
+
+class FeatureCache:
+    """The 2048/512 STFT magnitude of one signal and what is derived from it.
+
+    samples_score, rhythm_contour and the analyze tempo/cue estimates all
+    start from this framing; passing one cache to each of them computes the
+    STFT once per track instead of once per feature. Audio is taken as
+    float32 (as librosa.load returns it); with a non-CPU `device` the STFT
+    runs there via torch.stft and is copied back once.
+    """
+
+    n_fft = 2048
     hop = 512
-    S = librosa.stft(y, n_fft=2048, hop_length=hop)
-    Sm = _stft_bandpass(S, sr, hop, 500.0, 4000.0)
-    onset_env = librosa.onset.onset_strength(S=np.abs(Sm), sr=sr, hop_length=hop)
-    rms = librosa.feature.rms(S=np.abs(S), hop_length=hop).flatten()
-    # smooth rms via harmonic component proxy
-    rms_s = librosa.util.normalize(librosa.effects.harmonic(rms, margin=3.0))
-    t = librosa.frames_to_time(np.arange(len(onset_env)), sr=sr, hop_length=hop)
+
+    def __init__(self, y: np.ndarray, sr: int, device: str | None = None) -> None:
+        self.y = y
+        self.sr = sr
+        self.device = device
+        self._mag: np.ndarray | None = None
+        self._mel_db: np.ndarray | None = None
+        self._onsets: dict = {}
+
+    def stft_mag(self) -> np.ndarray:
+        if self._mag is None:
+            if self.device and self.device != "cpu":
+                # F-ordered like librosa's, so band views keep contiguous frames
+                self._mag = np.asfortranarray(_stft_mag_torch(self.y, self.n_fft, self.hop, self.device).cpu().numpy())
+            else:
+                # float32 input keeps the STFT complex64 (and mag float32)
+                y = np.asarray(self.y, dtype=np.float32)
+                self._mag = np.abs(librosa.stft(y, n_fft=self.n_fft, hop_length=self.hop))
+        return self._mag
+
+    def mel_db(self) -> np.ndarray:
+        """Log-power mel spectrogram, as onset_strength(y=...) builds it internally."""
+        if self._mel_db is None:
+            mel = librosa.feature.melspectrogram(S=self.stft_mag() ** 2, sr=self.sr)
+            self._mel_db = librosa.power_to_db(mel)
+        return self._mel_db
+
+    def onset_env(self, aggregate=None) -> np.ndarray:
+        """librosa.onset.onset_strength(y=y, sr=sr[, aggregate=...]) from the cached spectrogram."""
+        if aggregate not in self._onsets:
+            kw = {} if aggregate is None else {"aggregate": aggregate}
+            self._onsets[aggregate] = librosa.onset.onset_strength(S=self.mel_db(), sr=self.sr, hop_length=self.hop, **kw)
+        return self._onsets[aggregate]
+
+
+def samples_score(
+    y: np.ndarray, sr: int, device: str | None = None, cache: FeatureCache | None = None
+) -> float:
+    """Heuristic score in [0,1] for presence of midrange 'samples' around break sections.
+
+    With a non-CPU `device` the STFT magnitude is computed there (torch.stft)
+    and copied back once; the rest of the scoring is unchanged. A `cache`
+    for the same `y` supplies (and keeps) the STFT magnitude.
+    """
+    hop = FeatureCache.hop
+    # one magnitude pass; the onset band is a view of it
+    mag = (cache or FeatureCache(y, sr, device)).stft_mag()
+    onset_env = librosa.onset.onset_strength(S=_stft_bandpass(mag, sr, hop, 500.0, 4000.0), sr=sr, hop_length=hop)
+    rms = librosa.feature.rms(S=mag, hop_length=hop).flatten()
+    # smooth the RMS envelope with a 9-frame running median
+    rms_s = librosa.util.normalize(median_filter(rms, size=9, mode="nearest"))
 
     # candidate breaks = local minima below 40th percentile
     thresh = np.percentile(rms_s, 40)
-    dif = np.diff(rms_s)
-    mins = np.where((rms_s < thresh) & (np.r_[True, dif < 0] & np.r_[dif > 0, True]))[0]
+    # strictly below both neighbours (an end frame only needs its one neighbour),
+    # built in place instead of via np.diff + two np.r_ concatenations
+    is_min = rms_s < thresh
+    is_min[1:] &= rms_s[1:] < rms_s[:-1]
+    is_min[:-1] &= rms_s[:-1] < rms_s[1:]
+    mins = np.flatnonzero(is_min)
     if mins.size == 0:
         return 0.0
     pick = np.argsort(rms_s[mins])[:2]
@@ -38,7 +137,8 @@ def samples_score(y: np.ndarray, sr: int) -> float:
         return int(np.sum(onset_env[lo:hi] > med))
 
     total = sum(count_onsets(bf) for bf in break_frames)
-    dur = float(t[-1]) if len(t) else 180.0
+    # only the last frame time is needed, not the whole frames_to_time array
+    dur = float(librosa.frames_to_time(len(onset_env) - 1, sr=sr, hop_length=hop)) if len(onset_env) else 180.0
     norm = total / max(1.0, dur / 180.0)
     alpha = 8.0
     score = float(1.0 - np.exp(-norm / alpha))
@@ -48,62 +148,148 @@ def samples_score(y: np.ndarray, sr: int) -> float:
 def bass_contour(y: np.ndarray, sr: int) -> Tuple[np.ndarray, float]:
     """Return (contour_hz over time, reliability 0..1) using dominant low-band frequency per frame."""
     hop = 512
-    S = librosa.stft(y, n_fft=4096, hop_length=hop, window="hann")
+    # float32 in keeps the STFT complex64 and the magnitude float32 for float64 callers too
+    S = librosa.stft(np.asarray(y, dtype=np.float32), n_fft=4096, hop_length=hop, window="hann")
     mag = np.abs(S)
-    freqs = np.linspace(0, sr / 2, mag.shape[0])
-    band = (freqs >= 40.0) & (freqs <= 200.0)
+    del S
+    freqs = _freqs(sr, mag.shape[0])
+    band = _band_slice(sr, mag.shape[0], 40.0, 200.0)
+    Mb = mag[band, :]
+    idx, peak, med = _column_stats(Mb)
+    prom = (peak / (med + 1e-6))
+    return _finish_bass_contour(freqs[band], idx, prom)
+
+
+@njit(cache=True, nogil=True)
+def _column_stats(M: np.ndarray):
+    """(argmax, max, median) of each column of M in one sweep.
+
+    Matches np.argmax / max / np.median along axis 0 (first index on ties;
+    mean of the two middle values for an even row count). Columns are short
+    (the bass band is ~30 bins) and contiguous in librosa's F-ordered STFT,
+    so each is read once and insertion-sorted into a scratch buffer.
+    """
+    n, t = M.shape
+    idx = np.empty(t, dtype=np.int64)
+    peak = np.empty(t, dtype=M.dtype)
+    med = np.empty(t, dtype=M.dtype)
+    buf = np.empty(n, dtype=M.dtype)
+    k = n // 2
+    for j in range(t):
+        best = 0
+        top = M[0, j]
+        buf[0] = top
+        for i in range(1, n):
+            v = M[i, j]
+            if v > top:
+                top = v
+                best = i
+            p = i
+            while p > 0 and buf[p - 1] > v:
+                buf[p] = buf[p - 1]
+                p -= 1
+            buf[p] = v
+        idx[j] = best
+        peak[j] = top
+        if n % 2:
+            med[j] = buf[k]
+        else:
+            med[j] = (buf[k - 1] + buf[k]) * 0.5
+    return idx, peak, med
+
+
+def bass_contour_torch(y, sr: int, device: str) -> Tuple[np.ndarray, float]:
+    """bass_contour with the STFT and low-band argmax on `device` (torch.stft / cuFFT).
+
+    Matches the librosa path (periodic Hann, zero-padded centering); only the
+    per-frame argmax and prominence come back to the host.
+    """
+    import torch
+
+    mag = _stft_mag_torch(y, 4096, 512, device)
+    band = _band_slice(sr, mag.shape[0], 40.0, 200.0)
     Mb = mag[band, :]
-    fb = freqs[band]
-    idx = np.argmax(Mb, axis=0)
-    contour_hz = fb[idx]
-    prom = (Mb.max(axis=0) / (np.median(Mb, axis=0) + 1e-6))
+    idx = Mb.argmax(dim=0)
+    prom = Mb.amax(dim=0) / (torch.quantile(Mb, 0.5, dim=0) + 1e-6)
+    return _finish_bass_contour(_freqs(sr, mag.shape[0])[band], idx.cpu().numpy(), prom.cpu().numpy())
+
+
+def _finish_bass_contour(fb: np.ndarray, idx: np.ndarray, prom: np.ndarray) -> Tuple[np.ndarray, float]:
+    # look up straight into float32 (bin centres are exact enough), so the
+    # median filter runs on float32 and the final cast is a no-op
+    contour_hz = fb.astype(np.float32)[idx]
     rel = float(np.clip(np.median(prom) / 5.0, 0.0, 1.0))
-    # median smoothing via nearest-neighbors filter
-    contour_hz = librosa.decompose.nn_filter(contour_hz[None, :], aggregate=np.median, metric="cosine")[0]
-    return contour_hz.astype(np.float32), rel
+    # 9-frame running median; "nearest" edges so the ends aren't pulled towards 0
+    contour_hz = median_filter(contour_hz, size=9, mode="nearest")
+    return contour_hz.astype(np.float32, copy=False), rel
 
 
 def bass_similarity(seed_contour: np.ndarray, cand_contour: np.ndarray) -> float:
     """Similarity in [0,1] via DTW on log-Hz contours."""
     if seed_contour.size == 0 or cand_contour.size == 0:
         return 0.0
-    def prep(c: np.ndarray) -> np.ndarray:
-        c = np.log(np.clip(c, 1.0, None))
-        return librosa.util.fix_length(c, size=512)
-    a, b = prep(seed_contour), prep(cand_contour)
-    D, wp = librosa.sequence.dtw(a[:, None], b[:, None], metric="euclidean")
-    d = float(D[-1, -1]) / max(1, len(wp))
-    return float(np.exp(-d / 2.0))
+    a = _prep_contour(seed_contour, 512, log=True)
+    b = _prep_contour(cand_contour, 512, log=True)
+    return _dtw_similarity(a, b)
 
 
-def rhythm_contour(y: np.ndarray, sr: int) -> Tuple[np.ndarray, float]:
+def rhythm_contour(y: np.ndarray, sr: int, cache: FeatureCache | None = None) -> Tuple[np.ndarray, float]:
     """
     Extract a normalized onset based rhythm contour and a simple reliability score.
     Returns (contour, reliability), where:
       - contour is a 1D np.ndarray of fixed length (256).
       - reliability is a float in [0, 1].
+    A `cache` for the same `y` supplies the onset envelope.
     """
     hop = 512
-    onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop)
+    if cache is not None:
+        onset_env = cache.onset_env()
+    else:
+        onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop)
 
     if onset_env.size == 0:
         return np.zeros(0, dtype=np.float32), 0.0
 
-    # Normalize 0..1
+    # Normalize 0..1; reliability is how peaky the rhythm is, crude but useful
     onset_env = onset_env.astype(np.float32)
-    onset_env -= onset_env.min()
-    if onset_env.max() > 0:
-        onset_env /= onset_env.max()
+    peak_ratio = _normalize_and_peak(onset_env)
 
     contour = librosa.util.fix_length(onset_env, size=256)
 
-    # Reliability: how peaky the rhythm is, crude but useful
-    peak_ratio = float(np.mean(onset_env > 0.5))
     rel = float(np.clip(peak_ratio * 2.0, 0.0, 1.0))
 
     return contour.astype(np.float32), rel
 
 
+@njit(cache=True, nogil=True)
+def _normalize_and_peak(e: np.ndarray) -> float:
+    """Min-max scale e to 0..1 in place; return the fraction of frames above 0.5.
+
+    Same arithmetic as `e -= e.min(); e /= e.max()` (left at 0 when flat),
+    with the scale and the peak count fused into one pass. No fastmath, so the
+    division stays a division and results match the NumPy version bit for bit.
+    """
+    n = e.shape[0]
+    mn = e[0]
+    mx = e[0]
+    for i in range(1, n):
+        x = e[i]
+        if x < mn:
+            mn = x
+        elif x > mx:
+            mx = x
+    span = mx - mn
+    cnt = 0
+    for i in range(n):
+        x = e[i] - mn
+        if span > 0:
+            x = x / span
+        e[i] = x
+        if x > 0.5:
+            cnt += 1
+    return cnt / n
+
+
 def rhythm_similarity(a: np.ndarray, b: np.ndarray) -> float:
     """
     Similarity of two rhythm contours in [0, 1] using DTW.
@@ -112,13 +298,83 @@ def rhythm_similarity(a: np.ndarray, b: np.ndarray) -> float:
     if a.size == 0 or b.size == 0:
         return 0.0
 
-    a = librosa.util.fix_length(a, size=256)
-    b = librosa.util.fix_length(b, size=256)
+    return _dtw_similarity(_prep_contour(a, 256), _prep_contour(b, 256))
+
+
+def batch_similarity(seed: np.ndarray, cands: list, kind: str = "bass", n_jobs: int = -1) -> np.ndarray:
+    """bass_similarity / rhythm_similarity of one seed against many candidate contours.
+
+    The seed is prepped once and the prepped candidates (all the same length)
+    are stacked and scored by one parallel numba call; n_jobs=1 scores them
+    one by one instead. Empty candidates score 0.0.
+    """
+    size, log = (512, True) if kind == "bass" else (256, False)
+    out = np.zeros(len(cands), dtype=np.float64)
+    seed = np.asarray(seed, dtype=float)
+    if seed.size == 0:
+        return out
+    a = _prep_contour(seed, size, log)
+    todo = [i for i, c in enumerate(cands) if np.size(c)]
+    if not todo:
+        return out
+    if n_jobs == 1 or len(todo) < 2:
+        out[todo] = [_dtw_similarity(a, _prep_contour(np.asarray(cands[i], dtype=float), size, log)) for i in todo]
+        return out
+    b = np.stack([_prep_contour(np.asarray(cands[i], dtype=float), size, log) for i in todo])
+    radius = max(1, int(DTW_BAND * size))
+    cost = dtw_band_many(a, b, radius)
+    # same normalization and scale as _dtw_similarity
+    out[todo] = np.exp(-(cost / (2 * size)) / 2.0)
+    return out
+
+
+def _prep_contour(c: np.ndarray, size: int, log: bool = False) -> np.ndarray:
+    """fix_length (after log-clipping Hz if `log`) as float64, cached by content.
+
+    A seed is compared against every candidate, so its prep is a cache hit
+    after the first call. The result is shared and read-only.
+    """
+    c = np.ascontiguousarray(c).reshape(-1)
+    return _prep_cached(c.tobytes(), c.dtype.str, size, log)
+
+
+@lru_cache(maxsize=256)
+def _prep_cached(raw: bytes, dtype: str, size: int, log: bool) -> np.ndarray:
+    c = np.frombuffer(raw, dtype=dtype)
+    if log:
+        c = np.log(np.clip(c, 1.0, None))
+    out = np.ascontiguousarray(librosa.util.fix_length(c, size=size), dtype=np.float64)
+    out.flags.writeable = False
+    return out
+
+
+def _trivial_dtw_cost(a: np.ndarray, b: np.ndarray) -> float | None:
+    """The DTW cost without running DTW when it is known exactly, else None.
+
+    Equal-length contours only (as prepped): identical ones cost 0, and
+    against a flat contour no warp beats the diagonal, so the cost is the
+    running sum of |a - c| in path order. Flat contours are common (tracks
+    with no bass line pin to one bin, silent intros give flat onsets).
+    """
+    if a.shape != b.shape or a.size == 0:
+        return None
+    if np.array_equal(a, b):
+        return 0.0
+    for flat, other in ((b, a), (a, b)):
+        if flat.min() == flat.max():
+            return float(np.cumsum(np.abs(other - flat[0]))[-1])
+    return None
 
-    # 1D DTW over the contours
-    D, wp = librosa.sequence.dtw(a[:, None], b[:, None], metric="euclidean")
-    d = float(D[-1, -1]) / max(1, len(wp))
 
+def _dtw_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """exp(-d/2) of the banded 1-D DTW cost per step (cost / (len(a) + len(b)))."""
+    a = np.ascontiguousarray(a, dtype=np.float64)
+    b = np.ascontiguousarray(b, dtype=np.float64)
+    cost = _trivial_dtw_cost(a, b)
+    if cost is None:
+        radius = max(1, int(DTW_BAND * max(len(a), len(b))))
+        cost = dtw_band(a, b, radius)
+    d = float(cost) / (len(a) + len(b))
     # Convert distance to similarity, scale is tunable
     return float(np.exp(-d / 2.0))
 
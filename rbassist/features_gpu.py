@@ -0,0 +1,72 @@
+"""Batched contour similarity on a torch device (one seed vs. many candidates)."""
+from __future__ import annotations
+
+import numpy as np
+import torch
+
+from ._dtw import _BIG
+from .features import DTW_BAND, _prep_contour
+
+
+def dtw_band_batch(a: torch.Tensor, b: torch.Tensor, radius: int) -> torch.Tensor:
+    """dtw_band of one series a [n] against every row of b [K, m]; returns [K] costs.
+
+    Same recurrence and Sakoe-Chiba band as the numba kernel, evaluated one
+    anti-diagonal at a time so each step updates all K candidates (and every
+    cell on the diagonal) in a few tensor ops.
+    """
+    n = a.shape[0]
+    k_rows, m = b.shape
+    dev, dt = b.device, b.dtype
+    i = torch.arange(n, device=dev)
+    centre = (i * m) // n
+    lo = (centre - radius).clamp(min=0)
+    hi = (centre + radius + 1).clamp(max=m)
+    hi[-1] = m  # the band must reach the end cell
+    big_col = torch.full((k_rows, 1), _BIG, device=dev, dtype=dt)
+    prev1 = torch.full((k_rows, n), _BIG, device=dev, dtype=dt)  # diagonal d-1, indexed by i
+    prev2 = torch.full((k_rows, n), _BIG, device=dev, dtype=dt)  # diagonal d-2
+    a = a.to(dt)[None, :]
+    for d in range(n + m - 1):
+        j = d - i
+        valid = (j >= lo) & (j < hi)
+        cost = (a - b[:, j.clamp(0, m - 1)]).abs()
+        if d == 0:
+            new = torch.where(valid, cost, prev1)
+        else:
+            up = torch.cat([big_col, prev1[:, :-1]], dim=1)  # (i-1, j)
+            diag = torch.cat([big_col, prev2[:, :-1]], dim=1)  # (i-1, j-1)
+            best = torch.minimum(torch.minimum(diag, prev1), up)  # prev1[i] is (i, j-1)
+            new = torch.where(valid, cost + best, torch.full_like(cost, _BIG))
+        prev2, prev1 = prev1, new
+    return prev1[:, n - 1]
+
+
+def batch_similarity_torch(
+    seed: np.ndarray,
+    cands: list,
+    kind: str = "bass",
+    device: torch.device | str | None = None,
+) -> np.ndarray:
+    """features.batch_similarity with the DTW for all candidates in one batched pass on `device`."""
+    if device is None:
+        from .gpu_utils import select_optimal_device
+
+        device = select_optimal_device()
+    size, log = (512, True) if kind == "bass" else (256, False)
+    out = np.zeros(len(cands), dtype=np.float64)
+    seed = np.asarray(seed, dtype=float)
+    todo = [i for i, c in enumerate(cands) if np.size(c)]
+    if seed.size == 0 or not todo:
+        return out
+    a = torch.tensor(_prep_contour(seed, size, log), dtype=torch.float32, device=device)
+    b = torch.as_tensor(
+        np.stack([_prep_contour(np.asarray(cands[i], dtype=float), size, log) for i in todo]),
+        dtype=torch.float32,
+        device=device,
+    )
+    radius = max(1, int(DTW_BAND * size))
+    cost = dtw_band_batch(a, b, radius)
+    # same normalization and scale as features._dtw_similarity
+    out[todo] = torch.exp(-(cost / (2 * size)) / 2.0).cpu().numpy()
+    return out
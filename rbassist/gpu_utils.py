@@ -1,4 +1,3 @@
-import torch
 import os
 
 def select_optimal_device(prefer_gpu=True):
@@ -11,6 +10,8 @@ def select_optimal_device(prefer_gpu=True):
     Returns:
         torch.device: Selected device for processing
     """
+    import torch  # imported on use; importing torch takes seconds
+
     if prefer_gpu and torch.cuda.is_available():
         # Intelligent GPU selection
         gpu_count = torch.cuda.device_count()
@@ -34,6 +35,8 @@ def get_system_info():
     Returns:
         dict: Detailed system processing information
     """
+    import torch
+
     return {
         'cpu': {
             'total_cores': os.cpu_count(),
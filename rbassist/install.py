@@ -61,10 +61,12 @@ def decide_torch_args(sysname, machine):
     return [*pkgs]  # CPU wheel
 
 
-def pip_install(pip, *packages):
-    run([pip, "install", "--upgrade", "pip"])
-    if packages:
-        run([pip, "install", *packages])
+PIP_FLAGS = ["--no-input", "--disable-pip-version-check"]
+
+
+def pip_install(py, *args):
+    """One `python -m pip install` call; callers batch packages so pip resolves them together."""
+    run([py, "-m", "pip", "install", *PIP_FLAGS, *args])
 
 
 def which(cmd):
@@ -129,24 +131,33 @@ def main():
     machine = platform.machine().lower()
     print(f"Detected platform: {sysname} / {machine}")
 
-    py, pip = ensure_venv()
+    py, _pip = ensure_venv()
     print(f"Using interpreter: {py}")
+    os.environ.setdefault("PIP_NO_PYTHON_VERSION_WARNING", "1")
+
+    pip_install(py, "--upgrade", "pip")
 
     torch_args = decide_torch_args(sysname, machine)
     print(f"Installing torch with args: {torch_args}")
-    pip_install(pip, *torch_args)
-
-    pip_install(pip, *COMMON_DEPS)
+    batch = [*COMMON_DEPS]
 
     repo_root = os.getcwd()
     pyproject = os.path.join(repo_root, "pyproject.toml")
     setup_py = os.path.join(repo_root, "setup.py")
     if os.path.isfile(pyproject) or os.path.isfile(setup_py):
         print("Installing local package in editable mode (-e) ...")
-        run([py, "-m", "pip", "install", "-e", "."])
+        batch += ["-e", "."]
     else:
         print("No pyproject.toml/setup.py found; skipping editable install.")
 
+    if "-i" in torch_args:
+        # A custom index would apply to every package in the call, so the
+        # CUDA wheel gets its own install; the rest still resolve together.
+        pip_install(py, *torch_args)
+    else:
+        batch = [*torch_args, *batch]
+    pip_install(py, *batch)
+
     ok = auto_install_ffmpeg(sysname)
     if not ok:
         print("WARNING: ffmpeg is still missing. Some audio operations may fail until you install it.")
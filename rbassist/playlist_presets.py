@@ -1,79 +1,68 @@
 from __future__ import annotations
 
 import pathlib
-from typing import Dict, List
+from dataclasses import asdict, dataclass
+from operator import attrgetter
+from typing import Dict, List, Mapping
 
-import yaml
+from ._yamlio import safe_dump, safe_load
 
 _CONFIG_DIR = pathlib.Path(__file__).resolve().parents[1] / "config"
 _PRESET_FILE = _CONFIG_DIR / "playlist_presets.yml"
 
 
-def _read() -> List[Dict[str, object]]:
+@dataclass(slots=True)
+class Preset:
+    name: str = "Preset"
+    output: str = "rb_intelligent.xml"
+    mytag: str = ""
+    rating_min: int = 0
+    since: str = ""
+    until: str = ""
+
+    @classmethod
+    def from_dict(cls, item: Mapping[str, object]) -> "Preset":
+        return cls(
+            name=item.get("name", "Preset"),
+            output=item.get("output", "rb_intelligent.xml"),
+            mytag=item.get("mytag", ""),
+            rating_min=int(item.get("rating_min", 0) or 0),
+            since=item.get("since", "") or "",
+            until=item.get("until", "") or "",
+        )
+
+
+def _read() -> List[Preset]:
     if _PRESET_FILE.exists():
         try:
-            data = yaml.safe_load(_PRESET_FILE.read_text("utf-8")) or []
+            data = safe_load(_PRESET_FILE.read_text("utf-8")) or []
         except Exception:
             data = []
     else:
         data = []
-    presets: List[Dict[str, object]] = []
-    if isinstance(data, list):
-        for item in data:
-            if not isinstance(item, dict):
-                continue
-            presets.append(
-                {
-                    "name": item.get("name", "Preset"),
-                    "output": item.get("output", "rb_intelligent.xml"),
-                    "mytag": item.get("mytag", ""),
-                    "rating_min": int(item.get("rating_min", 0) or 0),
-                    "since": item.get("since", "") or "",
-                    "until": item.get("until", "") or "",
-                }
-            )
-    return presets
-
-
-def _write(presets: List[Dict[str, object]]) -> None:
+    if not isinstance(data, list):
+        return []
+    return [Preset.from_dict(item) for item in data if isinstance(item, dict)]
+
+
+def _write(presets: List[Preset]) -> None:
     _CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    payload = []
-    for preset in presets:
-        payload.append(
-            {
-                "name": preset.get("name", "Preset"),
-                "output": preset.get("output", "rb_intelligent.xml"),
-                "mytag": preset.get("mytag", ""),
-                "rating_min": int(preset.get("rating_min", 0) or 0),
-                "since": preset.get("since", "") or "",
-                "until": preset.get("until", "") or "",
-            }
-        )
-    _PRESET_FILE.write_text(yaml.safe_dump(payload, sort_keys=False), encoding="utf-8")
+    payload = [asdict(p) for p in presets]
+    _PRESET_FILE.write_text(safe_dump(payload, sort_keys=False), encoding="utf-8")
 
 
 def load_presets() -> List[Dict[str, object]]:
-    return _read()
-
-
-def upsert_preset(preset: Dict[str, object]) -> None:
-    presets = _read()
-    name = str(preset.get("name", "Preset"))
-    filtered = [p for p in presets if p.get("name") != name]
-    filtered.append(
-        {
-            "name": name,
-            "output": preset.get("output", "rb_intelligent.xml"),
-            "mytag": preset.get("mytag", ""),
-            "rating_min": int(preset.get("rating_min", 0) or 0),
-            "since": preset.get("since", "") or "",
-            "until": preset.get("until", "") or "",
-        }
-    )
-    filtered.sort(key=lambda p: p["name"])
-    _write(filtered)
+    return [asdict(p) for p in _read()]
 
 
-def delete_preset(name: str) -> None:
-    presets = [p for p in _read() if p.get("name") != name]
+def upsert_preset(preset: Mapping[str, object]) -> None:
+    new = Preset.from_dict(preset)
+    new.name = str(new.name)
+    presets = [p for p in _read() if p.name != new.name]
+    presets.append(new)
+    presets.sort(key=attrgetter("name"))
     _write(presets)
+
+
+def delete_preset(name: str) -> None:
+    _write([p for p in _read() if p.name != name])
@@ -1,5 +1,7 @@
 from __future__ import annotations
-import pathlib, yaml
+import bisect, copy, functools, pathlib
+
+from ._yamlio import safe_dump, safe_load
 
 CFG = (pathlib.Path(__file__).resolve().parents[1] / "rbassist" / "config.yml")
 DEFAULT = {"folders": [], "default_mode": "baseline"}
@@ -13,30 +15,81 @@ def _normalized(path: str) -> str:
     return resolved.as_posix().casefold()
 
 
-def load_prefs() -> dict:
-    if CFG.exists():
+def _cfg_key() -> tuple:
+    try:
+        st = CFG.stat()
+    except OSError:
+        return (str(CFG), None, None)
+    return (str(CFG), st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_cached(key: tuple) -> tuple[dict, tuple]:
+    """Parsed prefs plus the compiled folder rules, keyed by CFG path/mtime/size.
+
+    Shared between callers; load_prefs hands out copies.
+    """
+    prefs = DEFAULT
+    if key[1] is not None:
         try:
-            return yaml.safe_load(CFG.read_text("utf-8")) or DEFAULT
+            prefs = safe_load(CFG.read_text("utf-8")) or DEFAULT
         except Exception:
-            return DEFAULT
-    return DEFAULT
+            prefs = DEFAULT
+    return prefs, _compile_rules(prefs.get("folders", []))
+
+
+def _compile_rules(folders: list) -> tuple:
+    """Sorted normalized prefixes for bisect lookup in mode_for_path.
+
+    Returns (prefixes, parent, modes): parent[k] is the nearest earlier prefix
+    that is itself a prefix of prefixes[k] (-1 if none), and modes[k] is the
+    mode of whichever of k and its ancestors comes first in `folders`, which
+    keeps the first-listed-rule-wins behaviour of a linear scan.
+    """
+    first: dict[str, tuple[int, str]] = {}
+    for order, rule in enumerate(folders):
+        raw = rule.get("path", "")
+        if raw:
+            first.setdefault(_normalized(raw), (order, rule.get("mode", "baseline")))
+    prefixes = sorted(first)
+    parent: list[int] = []
+    best: list[tuple[int, str]] = []
+    stack: list[int] = []
+    for k, prefix in enumerate(prefixes):
+        while stack and not prefix.startswith(prefixes[stack[-1]]):
+            stack.pop()
+        up = stack[-1] if stack else -1
+        parent.append(up)
+        own = first[prefix]
+        best.append(own if up < 0 or own[0] < best[up][0] else best[up])
+        stack.append(k)
+    return tuple(prefixes), tuple(parent), tuple(mode for _, mode in best)
+
+
+def load_prefs() -> dict:
+    return copy.deepcopy(_load_cached(_cfg_key())[0])
 
 
 def mode_for_path(path: str) -> str:
-    prefs = load_prefs()
+    # re-parses config.yml only when it changes on disk, so a scan over many
+    # files costs one stat per lookup rather than a YAML parse
+    prefs, (prefixes, parent, modes) = _load_cached(_cfg_key())
     target = _normalized(path)
-    for rule in prefs.get("folders", []):
-        raw = rule.get("path", "")
-        if not raw:
-            continue
-        if target.startswith(_normalized(raw)):
-            return rule.get("mode", "baseline")
+    # Every rule that prefixes target sorts between it and target, so it is
+    # an ancestor of the last prefix <= target; climb until one matches.
+    i = bisect.bisect_right(prefixes, target) - 1
+    while i >= 0 and not target.startswith(prefixes[i]):
+        i = parent[i]
+    if i >= 0:
+        return modes[i]
     return prefs.get("default_mode", "baseline")
 
 
 def save_prefs(data: dict) -> None:
     CFG.parent.mkdir(parents=True, exist_ok=True)
-    CFG.write_text(yaml.safe_dump(data, sort_keys=False), encoding="utf-8")
+    CFG.write_text(safe_dump(data, sort_keys=False), encoding="utf-8")
+    # a rewrite within the filesystem's mtime granularity could keep the same key
+    _load_cached.cache_clear()
 
 
 def set_folder_mode(path: str, mode: str) -> None:
@@ -1,36 +1,99 @@
 from __future__ import annotations
-import json, pathlib, numpy as np
+import functools, json, os, pathlib, numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 import hnswlib
 from rich.table import Table
-from .utils import EMB, IDX, META, console, camelot_relation, tempo_match, load_meta
-try:
-    from .features import bass_similarity, rhythm_similarity
-except Exception:
-    bass_similarity = None  # type: ignore
-    rhythm_similarity = None  # type: ignore
+from ._jsonio import read_json, write_bytes_atomic, write_json
+from .utils import EMB, IDX, META, console, camelot_code, camelot_table, load_meta
 
 DIM = 1024
+# Stored vectors are unit length, so inner product is cosine similarity and
+# hnswlib's "ip" space skips the per-query normalization "cosine" does.
+INDEX_SPACE = {"space": "ip", "normalized": True}
+
+
+# Search breadth for queries; 0 means scale with k (see _query_ef).
+HNSW_EF = int(os.environ.get("RBASSIST_HNSW_EF", "0") or 0)
+
+
+def _query_ef(k: int) -> int:
+    """ef for a k-NN query: 2*k clamped to [64, 512] unless RBASSIST_HNSW_EF is set.
+
+    Higher ef raises recall at a modest latency cost; hnswlib never searches
+    with ef below k anyway.
+    """
+    return HNSW_EF or max(64, min(512, 2 * k))
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    """Unit-length rows (or vector) as float32; hnswlib's ip distance is then 1 - cosine."""
+    x = np.asarray(x, dtype=np.float32)
+    return x / (np.linalg.norm(x, axis=-1, keepdims=True) + 1e-12)
+
+
+def _space_file(idxfile: pathlib.Path) -> pathlib.Path:
+    return idxfile.with_suffix(".json")
+
+
+def _index_space(idxfile: pathlib.Path) -> str:
+    """Space an index was built in; indexes saved before the sidecar existed are cosine."""
+    try:
+        return str(read_json(_space_file(idxfile)).get("space", "cosine"))
+    except Exception:
+        return "cosine"
+
 
 class HnswIndex:
-    def __init__(self, dim: int = DIM, space: str = "cosine"):
+    def __init__(self, dim: int = DIM, space: str = INDEX_SPACE["space"]):
+        self.space = space
         self.index = hnswlib.Index(space=space, dim=dim)
         self._built = False
 
-    def build(self, vectors: List[np.ndarray], labels: List[int], M: int = 32, efC: int = 200):
-        self.index.init_index(max_elements=len(vectors), ef_construction=efC, M=M)
-        self.index.add_items(np.vstack(vectors), np.array(labels))
+    def build(self, vectors: List[np.ndarray] | np.ndarray, labels: List[int] | np.ndarray, M: int = 32, efC: int = 200):
+        """Add `vectors` (a list of rows or an (N, dim) float32 matrix, normalized in place for ip)."""
+        mat = vectors if isinstance(vectors, np.ndarray) else np.vstack(vectors).astype(np.float32, copy=False)
+        if self.space == "ip":
+            mat /= np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12
+        self.index.init_index(max_elements=len(mat), ef_construction=efC, M=M)
+        self.index.add_items(mat, np.asarray(labels))
         self.index.set_ef(64)
         self._built = True
 
     def save(self, path: str):
         self.index.save_index(path)
+        write_json(_space_file(pathlib.Path(path)), {"space": self.space, "normalized": self.space == "ip"})
 
     def load(self, path: str):
         self.index.load_index(path)
         self._built = True
 
 
+_INDEX_CACHE: dict[tuple[str, int], tuple[tuple[int, int], hnswlib.Index]] = {}
+
+
+def get_index(dim: int, idxfile: pathlib.Path | None = None) -> hnswlib.Index:
+    """The saved HNSW index, loaded once and reused until the file changes.
+
+    Keyed on path and dim and validated against the file's mtime/size, so a
+    rebuilt index is picked up on the next query. Queries on the shared
+    handle are read-only (hnswlib allows concurrent knn_query calls).
+    Query vectors must be passed through _l2_normalize first.
+    """
+    idxfile = idxfile or IDX / "hnsw.idx"
+    st = idxfile.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = (str(idxfile), int(dim))
+    hit = _INDEX_CACHE.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    index = hnswlib.Index(space=_index_space(idxfile), dim=int(dim))
+    index.load_index(str(idxfile))
+    index.set_ef(64)
+    _INDEX_CACHE[key] = (stamp, index)
+    return index
+
+
 def load_embedding_safe(path: str, expected_dim: int | None = None) -> np.ndarray | None:
     """Load embedding with shape validation; returns None on failure."""
     try:
@@ -45,18 +108,102 @@ def load_embedding_safe(path: str, expected_dim: int | None = None) -> np.ndarra
     return vec.astype(np.float32, copy=False)
 
 
+def _embedding_shard(meta: dict) -> np.ndarray | None:
+    """Read-only mmap of the combined-embedding shard written by build_embeddings, if any."""
+    state = (meta.get("shards") or {}).get("embedding")
+    if not state:
+        return None
+    try:
+        mm = np.load(state["path"], mmap_mode="r")
+    except Exception:
+        return None
+    if mm.ndim != 2 or mm.shape[0] < int(state.get("rows", 0)):
+        return None
+    return mm[: int(state.get("rows", 0))]
+
+
+def _track_vector(info: dict, shard: np.ndarray | None, expected_dim: int | None) -> np.ndarray | None:
+    """Embedding for a track: its shard row when present, else its .npy file."""
+    row = info.get("embedding_row")
+    if shard is not None and row is not None and row < shard.shape[0]:
+        if expected_dim is None or shard.shape[1] == expected_dim:
+            return np.asarray(shard[row], dtype=np.float32)
+    epath = info.get("embedding")
+    if not epath or not pathlib.Path(epath).exists():
+        return None
+    return load_embedding_safe(epath, expected_dim)
+
+
+def _collect_vectors(
+    items, shard: np.ndarray | None, expected_dim: int | None
+) -> tuple[list[str], np.ndarray | None]:
+    """Paths and an (N, dim) float32 matrix of their embeddings, skipping tracks without one.
+
+    Embeddings are read on a thread pool (np.load is file I/O and releases the
+    GIL) and written straight into one buffer sized for every candidate track,
+    sliced to the loaded rows at the end, rather than a list vstacked after.
+    """
+    items = list(items)
+    workers = min(16, (os.cpu_count() or 1) * 2)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        vecs = ex.map(lambda item: _track_vector(item[1], shard, expected_dim), items)
+        paths: list[str] = []
+        mat: np.ndarray | None = None
+        for (path, _info), vec in zip(items, vecs):
+            if vec is None:
+                continue
+            if mat is None:
+                mat = np.empty((len(items), vec.shape[0]), dtype=np.float32)
+            elif vec.shape[0] != mat.shape[1]:
+                console.print(f"[yellow]Skip embedding for {path}: expected dim {mat.shape[1]}, got {vec.shape[0]}")
+                continue
+            mat[len(paths)] = vec
+            paths.append(path)
+    if mat is None:
+        return paths, None
+    return paths, mat[: len(paths)]
+
+
+def _paths_lines(paths: list[str]) -> str:
+    return "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in paths)
+
+
+def load_paths_map(idx_dir: pathlib.Path | None = None) -> list[str]:
+    """Indexed track paths by label: paths.jsonl (one JSON string per line), else a legacy paths.json."""
+    idx_dir = idx_dir or IDX
+    lines = idx_dir / "paths.jsonl"
+    if lines.exists():
+        # split on "\n" only: str.splitlines also breaks on U+0085/U+2028/U+2029,
+        # which json.dumps(ensure_ascii=False) leaves unescaped inside paths
+        text = lines.read_bytes().decode("utf-8")
+        return json.loads("[" + ",".join(line for line in text.split("\n") if line) + "]")
+    return read_json(idx_dir / "paths.json")
+
+
+def _write_paths_map(paths: list[str], append: bool = False) -> None:
+    """Write the label -> path list; `append` adds new labels without rewriting existing lines."""
+    lines = IDX / "paths.jsonl"
+    if append and lines.exists():
+        with open(lines, "a", encoding="utf-8") as f:
+            f.write(_paths_lines(paths))
+        return
+    write_bytes_atomic(lines, _paths_lines(paths).encode("utf-8"))
+    (IDX / "paths.json").unlink(missing_ok=True)
+
+
 def build_index(incremental: bool = False) -> None:
     meta = load_meta()
+    shard = _embedding_shard(meta)
     idxfile = IDX / "hnsw.idx"
-    mapfile = IDX / "paths.json"
     paths_map: list[str] = []
     index: hnswlib.Index | None = None
     expected_dim: int | None = None
 
-    if incremental and idxfile.exists() and mapfile.exists():
+    has_paths = (IDX / "paths.jsonl").exists() or (IDX / "paths.json").exists()
+    if incremental and idxfile.exists() and has_paths:
         try:
-            paths_map = json.load(open(mapfile, "r", encoding="utf-8"))
-            index = hnswlib.Index(space="cosine", dim=DIM)
+            paths_map = load_paths_map()
+            index = hnswlib.Index(space=_index_space(idxfile), dim=DIM)
             index.load_index(str(idxfile))
             index.set_ef(64)
             ids = index.get_ids_list()
@@ -73,61 +220,96 @@ def build_index(incremental: bool = False) -> None:
             incremental = False
 
     if not incremental:
-        vectors, labels, paths = [], [], []
-        for path, info in meta.get("tracks", {}).items():
-            epath = info.get("embedding")
-            if not epath or not pathlib.Path(epath).exists():
-                continue
-            vec = load_embedding_safe(epath, expected_dim)
-            if vec is None:
-                continue
-            if expected_dim is None:
-                expected_dim = vec.shape[0]
-            labels.append(len(paths))
-            paths.append(path)
-            vectors.append(vec)
-        if not vectors:
+        paths, mat = _collect_vectors(meta.get("tracks", {}).items(), shard, expected_dim)
+        if mat is None:
             console.print("[yellow]No embeddings found. Run: rbassist embed ...")
             return
-        dim = expected_dim or DIM
-        idx = HnswIndex(dim=dim)
-        idx.build(vectors, labels)
+        idx = HnswIndex(dim=mat.shape[1])
+        idx.build(mat, np.arange(len(paths), dtype=np.int64))
         (IDX / "hnsw.idx").parent.mkdir(parents=True, exist_ok=True)
         idx.save(str(idxfile))
-        json.dump(paths, open(mapfile, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
+        _write_paths_map(paths)
         console.print(f"[green]Indexed {len(paths)} tracks -> {idxfile}")
         return
 
     # Incremental: add new embeddings to existing index
     label_lookup = {p: i for i, p in enumerate(paths_map)}
-    new_vectors: list[np.ndarray] = []
-    new_labels: list[int] = []
-    new_paths: list[str] = []
     start_label = len(paths_map)
+    new_paths, new_mat = _collect_vectors(
+        ((p, info) for p, info in meta.get("tracks", {}).items() if p not in label_lookup),
+        shard,
+        expected_dim or DIM,
+    )
 
-    for path, info in meta.get("tracks", {}).items():
-        epath = info.get("embedding")
-        if not epath or not pathlib.Path(epath).exists():
-            continue
-        if path in label_lookup:
-            continue
-        vec = load_embedding_safe(epath, expected_dim or DIM)
-        if vec is None:
-            continue
-        new_vectors.append(vec)
-        new_labels.append(start_label + len(new_vectors) - 1)
-        new_paths.append(path)
-
-    if not new_vectors:
+    if new_mat is None:
         console.print(f"[green]Index up to date; {len(paths_map)} track(s).")
         return
 
-    index.add_items(np.vstack(new_vectors), np.array(new_labels))
-    paths_map.extend(new_paths)
+    # unit-length rows suit both spaces (cosine normalizes them again itself)
+    new_mat /= np.linalg.norm(new_mat, axis=1, keepdims=True) + 1e-12
+    if index.get_current_count() + len(new_paths) > index.get_max_elements():
+        index.resize_index(index.get_current_count() + len(new_paths))
+    index.add_items(new_mat, np.arange(start_label, start_label + len(new_paths), dtype=np.int64))
     (IDX / "hnsw.idx").parent.mkdir(parents=True, exist_ok=True)
     index.save_index(str(idxfile))
-    json.dump(paths_map, open(mapfile, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
-    console.print(f"[green]Added {len(new_vectors)} new embedding(s); total {len(paths_map)} track(s).")
+    if (IDX / "paths.jsonl").exists():
+        _write_paths_map(new_paths, append=True)
+    else:
+        _write_paths_map(paths_map + new_paths)  # first incremental run after a legacy paths.json
+    paths_map.extend(new_paths)
+    console.print(f"[green]Added {len(new_paths)} new embedding(s); total {len(paths_map)} track(s).")
+
+
+def _contour(info: dict, kind: str) -> np.ndarray:
+    """A track's stored bass/rhythm contour as a float64 array (empty when missing)."""
+    feats = info.get("features") or {}
+    return np.asarray((feats.get(f"{kind}_contour") or {}).get("contour") or (), dtype=np.float64)
+
+
+# Below this many candidates the numba kernel beats the per-diagonal kernel
+# launches of the torch wavefront, so smaller pools never touch the GPU.
+GPU_MIN_CANDIDATES = 512
+
+
+@functools.lru_cache(maxsize=1)
+def _accelerator():
+    """The CUDA/MPS device gpu_utils picks, or None (no torch, or only a CPU)."""
+    try:
+        from .gpu_utils import select_optimal_device
+
+        device = select_optimal_device()
+    except Exception:
+        return None
+    return device if getattr(device, "type", str(device)) in ("cuda", "mps") else None
+
+
+def _batch_similarity(n_cands: int = 0):
+    """Contour scorer for n_cands candidates, imported on first use (features pulls
+    in librosa, scipy and numba, which dominate start-up when no contour weight is set).
+
+    Large pools go to features_gpu.batch_similarity_torch on the selected GPU;
+    otherwise, or if that fails, features.batch_similarity (numba) scores them.
+    """
+    try:
+        from .features import batch_similarity
+    except Exception:
+        return None
+    device = _accelerator() if n_cands >= GPU_MIN_CANDIDATES else None
+    if device is None:
+        return batch_similarity
+    try:
+        from .features_gpu import batch_similarity_torch
+    except Exception:
+        return batch_similarity
+
+    def score(seed, cands, kind="bass"):
+        try:
+            return batch_similarity_torch(seed, cands, kind, device=device)
+        except Exception as e:
+            console.print(f"[yellow]GPU contour scoring failed ({e}); using CPU.")
+            return batch_similarity(seed, cands, kind)
+
+    return score
 
 
 def _tempo_note(seed_bpm: float | None, cand_bpm: float | None, pct: float, allow_doubletime: bool) -> str:
@@ -143,6 +325,83 @@ def _tempo_note(seed_bpm: float | None, cand_bpm: float | None, pct: float, allo
     return ""
 
 
+def _candidate_filter(
+    seed_key: str | None,
+    seed_bpm: float | None,
+    infos: list[dict],
+    camelot_neighbors: bool,
+    tempo_pct: float,
+    allow_doubletime: bool,
+) -> tuple[np.ndarray, list[str]]:
+    """(keep mask, Camelot rule name) for each candidate, without per-candidate rule calls.
+
+    Same outcome as camelot_relation / tempo_match: keys come from the
+    precomputed 24x24 relation table, tempos are compared as one array.
+    Missing or unparseable keys and BPMs never filter a candidate out.
+    """
+    keep = np.ones(len(infos), dtype=bool)
+    rules = ["-"] * len(infos)
+    seed_code = camelot_code(seed_key) if camelot_neighbors else -1
+    if seed_code >= 0 and infos:
+        row = camelot_table()[seed_code]
+        codes = [camelot_code(info.get("key")) for info in infos]
+        rules = [row[c][1] if c >= 0 else "-" for c in codes]
+        keep &= np.array([c < 0 or row[c][0] for c in codes], dtype=bool)
+    if seed_bpm and infos:
+        bpms = np.array([info.get("bpm") or 0.0 for info in infos], dtype=float)
+        tol = tempo_pct / 100.0
+        ok = (bpms == 0.0) | (np.abs(seed_bpm - bpms) <= tol * seed_bpm)
+        if allow_doubletime:
+            ok |= np.abs(seed_bpm * 2 - bpms) <= tol * (seed_bpm * 2)
+            ok |= np.abs(seed_bpm / 2 - bpms) <= tol * (seed_bpm / 2)
+        keep &= ok
+    return keep, rules
+
+
+# (header, right-aligned) per column of the recommend / recommend_sequence output
+_REC_COLUMNS = [
+    ("Rank", True), ("Track", False), ("Artist", False), ("Title", False),
+    ("BPM", True), ("Key", False), ("KeyRule", False), ("Dist", True),
+]
+_SEQ_COLUMNS = [("Rank", True), ("Track", False), ("Artist", False), ("Title", False), ("Dist", True)]
+
+
+def _emit_rows(title: str, columns: list[tuple[str, bool]], rows: list[tuple[str, ...]], plain: bool) -> None:
+    """Rich table for the terminal, or tab-separated lines on stdout when `plain`
+    (no cell measuring or styling, for pipes and large `top`)."""
+    if plain:
+        lines = ["\t".join(name for name, _ in columns)]
+        lines += ["\t".join(row) for row in rows]
+        print("\n".join(lines))
+        return
+    table = Table(title=title)
+    for name, right in columns:
+        table.add_column(name, justify="right" if right else "left")
+    for row in rows:
+        table.add_row(*row)
+    console.print(table)
+
+
+def _filtered_knn(index, query: np.ndarray, mask: np.ndarray, k: int) -> tuple[list[int], list[float]]:
+    """Nearest `k` labels whose mask entry is True, filtered inside the HNSW search.
+
+    Falls back to over-fetching and masking afterwards when this hnswlib has
+    no `filter=` (< 0.7) or the filtered walk cannot fill k results.
+    """
+    k = min(k, int(mask.sum()))
+    if k <= 0:
+        return [], []
+    index.set_ef(_query_ef(k + 50))
+    try:
+        labels, dists = index.knn_query(query, k=k, num_threads=1, filter=lambda label: label < len(mask) and bool(mask[label]))
+    except (TypeError, RuntimeError):
+        # hnswlib raises if k exceeds the index size
+        labels, dists = index.knn_query(query, k=min(k + 50, index.get_current_count()))
+        ok = mask[labels[0]]
+        return labels[0][ok].tolist(), dists[0][ok].tolist()
+    return labels[0].tolist(), dists[0].tolist()
+
+
 def recommend(
     seed: str,
     top: int = 25,
@@ -150,17 +409,20 @@ def recommend(
     allow_doubletime: bool = True,
     camelot_neighbors: bool = True,
     weights: Optional[Dict[str, float]] = None,
+    plain: bool = False,
 ):
+    """Print the nearest compatible tracks to `seed`; `plain` writes TSV instead of a table."""
     idxfile = IDX / "hnsw.idx"
-    paths_map = json.load(open(IDX / "paths.json", "r", encoding="utf-8"))
-    meta_all = load_meta()["tracks"]
+    paths_map = load_paths_map()
+    meta = load_meta()
+    meta_all = meta["tracks"]
 
     seed_path = _resolve_seed(seed, paths_map, meta_all)
     if not seed_path:
         console.print(f"[red]Seed not found: {seed}")
         return
     seed_info = meta_all.get(seed_path, {})
-    seed_vec = load_embedding_safe(seed_info["embedding"])  # (1024,)
+    seed_vec = _track_vector(seed_info, _embedding_shard(meta), None)  # (1024,)
     if seed_vec is None:
         console.print(f"[red]Seed embedding missing or invalid: {seed_info.get('embedding')}")
         return
@@ -168,27 +430,10 @@ def recommend(
     seed_bpm = seed_info.get("bpm")
     seed_key = seed_info.get("key")
 
-    # query ANN
-    index = hnswlib.Index(space="cosine", dim=seed_vec.shape[0])
-    index.load_index(str(idxfile))
-    index.set_ef(64)
-    labels, dists = index.knn_query(seed_vec, k=top + 50)  # fetch a wider pool for re-rank
-    labels, dists = labels[0].tolist(), dists[0].tolist()
-
     title = f"Recommendations for {seed_path}"
     if seed_bpm or seed_key:
         title += f"  (seed: {seed_bpm if seed_bpm else '-'} BPM | {seed_key if seed_key else '-'})"
 
-    table = Table(title=title)
-    table.add_column("Rank", justify="right")
-    table.add_column("Track")
-    table.add_column("Artist")
-    table.add_column("Title")
-    table.add_column("BPM", justify="right")
-    table.add_column("Key")
-    table.add_column("KeyRule")
-    table.add_column("Dist", justify="right")
-
     # optional weighted re-rank
     weights = weights or {}
     w_ann = float(weights.get("ann", 0.0))
@@ -197,50 +442,55 @@ def recommend(
     w_rhythm = float(weights.get("rhythm", 0.0))
 
     # load seed features for bass and rhythm
-    seed_c = np.array(seed_info.get("features", {}).get("bass_contour", {}).get("contour", []), dtype=float)
-    seed_r = np.array(seed_info.get("features", {}).get("rhythm_contour", {}).get("contour", []), dtype=float)
-
-    # collect candidates first
+    seed_c = _contour(seed_info, "bass")
+    seed_r = _contour(seed_info, "rhythm")
+
+    # key/tempo compatibility for every indexed track, applied inside the ANN
+    # search; a weighted re-rank still gets a wider pool to reorder
+    infos = [meta_all.get(p, {}) for p in paths_map]
+    keep, rules = _candidate_filter(seed_key, seed_bpm, infos, camelot_neighbors, tempo_pct, allow_doubletime)
+    keep[[i for i, p in enumerate(paths_map) if p == seed_path]] = False
+    pool = top + 50 if any([w_ann, w_samples, w_bass, w_rhythm]) else top
+    index = get_index(seed_vec.shape[0], idxfile)
+    labels, dists = _filtered_knn(index, _l2_normalize(seed_vec), keep, pool)
+
+    # scores are computed for all candidates at once below
     cands = []
+    bass_conts: list[np.ndarray] = []
+    rhythm_conts: list[np.ndarray] = []
     for label, dist in zip(labels, dists):
-        path = paths_map[label]
-        if path == seed_path:
-            continue
-        info = meta_all.get(path, {})
+        path, info, rule_name = paths_map[label], infos[label], rules[label]
         cand_bpm = info.get("bpm")
         cand_key = info.get("key")
-        ok_key, rule_name = camelot_relation(seed_key, cand_key) if camelot_neighbors else (True, "-")
-        if camelot_neighbors and not ok_key:
-            continue
-        if not tempo_match(seed_bpm, cand_bpm, pct=tempo_pct, allow_doubletime=allow_doubletime):
-            continue
-        score = 0.0
-        # base ANN score: invert distance
-        score += w_ann * float(1.0 - float(dist))
-        # samples score from candidate features
-        samp = float(info.get("features", {}).get("samples", 0.0))
-        score += w_samples * samp
-        # bass similarity
-        if w_bass and bass_similarity is not None:
-            c_cont = np.array(info.get("features", {}).get("bass_contour", {}).get("contour", []), dtype=float)
-            if seed_c.size and c_cont.size:
-                score += w_bass * float(bass_similarity(seed_c, c_cont))
-        # rhythm similarity
-        if w_rhythm and rhythm_similarity is not None:
-            r_cont = np.array(info.get("features", {}).get("rhythm_contour", {}).get("contour", []), dtype=float)
-            if seed_r.size and r_cont.size:
-                score += w_rhythm * float(rhythm_similarity(seed_r, r_cont))
-        cands.append((path, info, cand_bpm, cand_key, rule_name, dist, score))
+        if w_bass:
+            bass_conts.append(_contour(info, "bass"))
+        if w_rhythm:
+            rhythm_conts.append(_contour(info, "rhythm"))
+        cands.append((path, info, cand_bpm, cand_key, rule_name, dist))
+
+    # weighted score: inverted ANN distance + candidate samples score
+    # + bass / rhythm similarity (empty contours score 0)
+    cand_dists = np.array([c[5] for c in cands], dtype=float)
+    samples = np.array([float(c[1].get("features", {}).get("samples", 0.0)) for c in cands], dtype=float)
+    scores = w_ann * (1.0 - cand_dists)
+    scores += w_samples * samples
+    batch_similarity = _batch_similarity(len(cands)) if cands and (w_bass or w_rhythm) else None
+    if batch_similarity is not None:
+        if w_bass and seed_c.size:
+            scores += w_bass * batch_similarity(seed_c, bass_conts, "bass")
+        if w_rhythm and seed_r.size:
+            scores += w_rhythm * batch_similarity(seed_r, rhythm_conts, "rhythm")
 
     # sort: if any weight provided, sort by score desc; else by ANN distance asc
+    # (stable, so ties keep ANN order as list.sort did)
     if any([w_ann, w_samples, w_bass, w_rhythm]):
-        cands.sort(key=lambda x: x[6], reverse=True)
+        order = np.argsort(-scores, kind="stable")
     else:
-        cands.sort(key=lambda x: x[5])
+        order = np.argsort(cand_dists, kind="stable")
+    cands = [cands[i] for i in order[:top]]
 
-    rank = 1
-    for path, info, cand_bpm, cand_key, rule_name, dist, _score in cands[:top]:
-        table.add_row(
+    rows = [
+        (
             str(rank),
             path,
             info.get("artist", ""),
@@ -250,42 +500,60 @@ def recommend(
             rule_name,
             f"{dist:.3f}",
         )
-        rank += 1
+        for rank, (path, info, cand_bpm, cand_key, rule_name, dist) in enumerate(cands, start=1)
+    ]
+    _emit_rows(title, _REC_COLUMNS, rows, plain)
 
-    console.print(table)
 
+def _iter_haystack(paths_map: list[str], meta_all: dict):
+    for p in paths_map:
+        info = meta_all.get(p, {})
+        yield p.lower(), (info.get("artist", "") + " - " + info.get("title", "")).lower()
 
-def _resolve_seed(seed: str, paths_map: list[str], meta_all: dict) -> str | None:
-    matches = [
-        p
-        for p in paths_map
-        if seed.lower() in p.lower()
-        or seed.lower() in (meta_all.get(p, {}).get("artist", "") + " - " + meta_all.get(p, {}).get("title", "")).lower()
-    ]
-    return matches[0] if matches else None
+
+def _seed_haystack(paths_map: list[str], meta_all: dict) -> list[tuple[str, str]]:
+    """Lowercased (path, "artist - title") per label, built once for any number of seeds."""
+    return list(_iter_haystack(paths_map, meta_all))
+
+
+def _resolve_seed(
+    seed: str, paths_map: list[str], meta_all: dict, haystack: list[tuple[str, str]] | None = None
+) -> str | None:
+    """First indexed path whose path or "artist - title" contains `seed` (case-insensitive)."""
+    needle = seed.lower()
+    if haystack is None:
+        haystack = _iter_haystack(paths_map, meta_all)  # one seed: stop at the first match
+    for p, (path_l, name_l) in zip(paths_map, haystack):
+        if needle in path_l or needle in name_l:
+            return p
+    return None
 
 
 def recommend_sequence(
     seeds: list[str],
     top: int = 25,
     pool: int = 100,
+    plain: bool = False,
 ) -> None:
     if not seeds:
         console.print("[red]Provide at least one seed.")
         return
     idxfile = IDX / "hnsw.idx"
-    paths_map = json.load(open(IDX / "paths.json", "r", encoding="utf-8"))
-    meta_all = load_meta()["tracks"]
+    paths_map = load_paths_map()
+    meta = load_meta()
+    meta_all = meta["tracks"]
+    shard = _embedding_shard(meta)
 
     resolved: list[str] = []
     vecs: list[np.ndarray] = []
+    haystack = _seed_haystack(paths_map, meta_all)
     for seed in seeds:
-        p = _resolve_seed(seed, paths_map, meta_all)
+        p = _resolve_seed(seed, paths_map, meta_all, haystack)
         if not p:
             console.print(f"[yellow]Seed not found: {seed}")
             continue
         info = meta_all.get(p, {})
-        vec = load_embedding_safe(info.get("embedding"))
+        vec = _track_vector(info, shard, None)
         if vec is None:
             console.print(f"[yellow]Seed has no embedding: {p}")
             continue
@@ -297,10 +565,9 @@ def recommend_sequence(
     mat = np.stack(vecs, axis=0)
     combined = mat.mean(axis=0)
 
-    index = hnswlib.Index(space="cosine", dim=combined.shape[0])
-    index.load_index(str(idxfile))
-    index.set_ef(64)
-    labels, dists = index.knn_query(combined, k=min(pool, len(paths_map)))
+    index = get_index(combined.shape[0], idxfile)
+    index.set_ef(_query_ef(pool))
+    labels, dists = index.knn_query(_l2_normalize(combined), k=min(pool, len(paths_map)))
     labels, dists = labels[0].tolist(), dists[0].tolist()
 
     seen = set(resolved)
@@ -314,19 +581,13 @@ def recommend_sequence(
         if len(rows) >= top:
             break
 
-    table = Table(title=f"Sequence recommendations from seeds: {', '.join(resolved)}")
-    table.add_column("Rank", justify="right")
-    table.add_column("Track")
-    table.add_column("Artist")
-    table.add_column("Title")
-    table.add_column("Dist", justify="right")
-
-    for idx, (path, info, dist) in enumerate(rows, start=1):
-        table.add_row(
-            str(idx),
-            path,
-            info.get("artist", ""),
-            info.get("title", ""),
-            f"{dist:.3f}",
-        )
-    console.print(table)
+    table_rows = [
+        (str(idx), path, info.get("artist", ""), info.get("title", ""), f"{dist:.3f}")
+        for idx, (path, info, dist) in enumerate(rows, start=1)
+    ]
+    _emit_rows(
+        f"Sequence recommendations from seeds: {', '.join(resolved)}",
+        _SEQ_COLUMNS,
+        table_rows,
+        plain,
+    )
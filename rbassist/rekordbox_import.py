@@ -4,7 +4,7 @@ from typing import Any, Dict, List
 from pathlib import Path
 
 from pyrekordbox import Rekordbox6Database
-from pyrekordbox.db6.tables import DjmdContent
+from pyrekordbox.db6.tables import DjmdContent, DjmdMyTag, DjmdSongMyTag
 
 from .utils import console
 from .tagstore import bulk_set_track_tags
@@ -24,46 +24,51 @@ def _normalize_rb_path(folder_path: str | None) -> str | None:
         return str(folder_path).strip()
 
 
+def _mytags_by_path(db: Rekordbox6Database) -> Dict[str, List[str]]:
+    """Map normalized FolderPath -> MyTag names for every tagged track.
+
+    Two flat queries (content paths, song/tag join) instead of walking
+    ``cont.MyTags`` per track, which lazy-loads one SELECT per content row.
+    """
+    session = db.session
+    tags_by_id: Dict[Any, List[str]] = {}
+    rows = (
+        session.query(DjmdSongMyTag.ContentID, DjmdMyTag.Name)
+        .join(DjmdMyTag, DjmdSongMyTag.MyTagID == DjmdMyTag.ID)
+        .order_by(DjmdSongMyTag.ContentID, DjmdSongMyTag.TrackNo)
+    )
+    for content_id, name in rows:
+        name = str(name).strip() if name else ""
+        if name:
+            tags_by_id.setdefault(content_id, []).append(name)
+    if not tags_by_id:
+        return {}
+
+    mapping: Dict[str, List[str]] = {}
+    for content_id, folder_path in session.query(DjmdContent.ID, DjmdContent.FolderPath):
+        names = tags_by_id.get(content_id)
+        if not names:
+            continue
+        # FolderPath is the canonical full path field used elsewhere in pyrekordbox.
+        key = _normalize_rb_path(folder_path)
+        if key:
+            mapping[key] = names
+    return mapping
+
+
 def import_rekordbox_mytags_from_db() -> int:
     """
     Import Rekordbox 6/7 MyTags directly from the encrypted master.db into
     rbassist's meta.json.
 
-    This is read-only with respect to Rekordbox: we only traverse ORM objects and
-    persist tags into rbassist's own metadata store.
+    This is read-only with respect to Rekordbox: we only read the content and
+    MyTag tables and persist tags into rbassist's own metadata store.
 
     Returns the number of (track, tag) associations that were added.
     """
     db = Rekordbox6Database()
     try:
-        mapping: Dict[str, List[str]] = {}
-        # get_content() with no filters returns a Query[DjmdContent]
-        query = db.get_content()
-        if isinstance(query, list):
-            contents: List[DjmdContent] = query
-        else:
-            contents = list(query.all())
-
-        added = 0
-        for cont in contents:
-            # FolderPath is the canonical full path field used elsewhere in pyrekordbox.
-            key = _normalize_rb_path(getattr(cont, "FolderPath", None))
-            if not key:
-                continue
-
-            # MyTags relationship is DjmdSongMyTag rows; MyTagName proxy gives the label.
-            tag_names = []
-            for item in getattr(cont, "MyTags", []):
-                name = getattr(item, "MyTagName", None)
-                if name:
-                    tag_names.append(str(name).strip())
-
-            clean = [t for t in tag_names if t]
-            if not clean:
-                continue
-
-            mapping[key] = clean
-
+        mapping = _mytags_by_path(db)
         if mapping:
             # Let tagstore handle keeping config/tags.yml and meta.json in sync.
             added = bulk_set_track_tags(mapping, only_existing=False)
@@ -9,20 +9,56 @@ This module provides a safety layer that separates:
 
 from __future__ import annotations
 
-import json
 import pathlib
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Set
-
-import yaml
+from typing import Callable, Dict, List, Set, Tuple
 
+from ._jsonio import read_json, write_bytes_atomic, write_json
+from ._yamlio import safe_dump, safe_load
 from .utils import console, load_meta, save_meta
 
 _CONFIG_DIR = pathlib.Path(__file__).resolve().parents[1] / "config"
 _USER_TAGS = _CONFIG_DIR / "my_tags.yml"
 _AI_SUGGESTIONS = _CONFIG_DIR / "ai_suggestions.json"
 _CORRECTION_LOG = _CONFIG_DIR / "tag_corrections.json"
+_CORRECTION_STATS = _CONFIG_DIR / "correction_stats.json"
+
+
+# Parsed file contents keyed by path, validated against (mtime_ns, size) so an
+# edit from another process is picked up; callers get copies to mutate.
+_CACHE: Dict[str, Tuple[Tuple[int, int], object]] = {}
+
+
+def _stamp(path: pathlib.Path) -> Tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _cached_load(path: pathlib.Path, parse: Callable[[], object], view: str = "") -> object:
+    """parse() of `path`, reused while the file is unchanged.
+
+    `view` names something derived from the file (e.g. the tag vocabulary),
+    cached and invalidated alongside the parsed contents.
+    """
+    stamp = _stamp(path)
+    key = f"{path}#{view}" if view else str(path)
+    hit = _CACHE.get(key)
+    if stamp is not None and hit is not None and hit[0] == stamp:
+        return hit[1]
+    data = parse()
+    if stamp is not None:
+        _CACHE[key] = (stamp, data)
+    return data
+
+
+def _remember(path: pathlib.Path, data: object) -> None:
+    stamp = _stamp(path)
+    if stamp is not None:
+        _CACHE[str(path)] = (stamp, data)
 
 
 class TagNamespace(Enum):
@@ -53,12 +89,17 @@ class TagPermissionError(Exception):
 
 
 def load_user_tags() -> Dict[str, List[str]]:
-    """Load user-owned tags from my_tags.yml"""
+    """Load user-owned tags from my_tags.yml (re-parsed only when the file changes)"""
     if not _USER_TAGS.exists():
         return {}
+    tags = _cached_load(_USER_TAGS, _parse_user_tags)
+    return {track: list(t) for track, t in tags.items()}
+
+
+def _parse_user_tags() -> Dict[str, List[str]]:
     try:
-        data = yaml.safe_load(_USER_TAGS.read_text("utf-8")) or {}
-        return data.get("tracks", {})
+        data = safe_load(_USER_TAGS.read_text("utf-8")) or {}
+        return data.get("tracks") or {}
     except Exception as e:
         console.print(f"[red]Error loading user tags: {e}")
         return {}
@@ -72,7 +113,8 @@ def save_user_tags(tags: Dict[str, List[str]]) -> None:
         "last_modified": datetime.utcnow().isoformat(),
         "tracks": tags,
     }
-    _USER_TAGS.write_text(yaml.safe_dump(data, sort_keys=False), encoding="utf-8")
+    write_bytes_atomic(_USER_TAGS, safe_dump(data, sort_keys=False).encode("utf-8"))
+    _remember(_USER_TAGS, {track: list(t) for track, t in tags.items()})
 
 
 def add_user_tag(
@@ -130,8 +172,13 @@ def load_ai_suggestions() -> Dict[str, Dict[str, float]]:
     """
     if not _AI_SUGGESTIONS.exists():
         return {}
+    suggestions = _cached_load(_AI_SUGGESTIONS, _parse_ai_suggestions)
+    return {track: dict(s) for track, s in suggestions.items()}
+
+
+def _parse_ai_suggestions() -> Dict[str, Dict[str, float]]:
     try:
-        data = json.loads(_AI_SUGGESTIONS.read_text("utf-8"))
+        data = read_json(_AI_SUGGESTIONS)
         return data.get("suggestions", {})
     except Exception:
         return {}
@@ -145,7 +192,8 @@ def save_ai_suggestions(suggestions: Dict[str, Dict[str, float]]) -> None:
         "generated": datetime.utcnow().isoformat(),
         "suggestions": suggestions,
     }
-    _AI_SUGGESTIONS.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    write_json(_AI_SUGGESTIONS, data)
+    _remember(_AI_SUGGESTIONS, {track: dict(s) for track, s in suggestions.items()})
 
 
 def add_ai_suggestion(track: str, tag: str, confidence: float) -> None:
@@ -167,9 +215,7 @@ def bulk_add_ai_suggestions(
     existing = load_ai_suggestions()
     count = 0
     for track, tag_scores in suggestions_dict.items():
-        if track not in existing:
-            existing[track] = {}
-        existing[track].update(tag_scores)
+        existing.setdefault(track, {}).update(tag_scores)
         count += 1
 
     save_ai_suggestions(existing)
@@ -225,15 +271,30 @@ def load_correction_history() -> List[Dict]:
     if not _CORRECTION_LOG.exists():
         return []
     try:
-        return json.loads(_CORRECTION_LOG.read_text("utf-8"))
+        return read_json(_CORRECTION_LOG)
     except Exception:
         return []
 
 
 def save_correction_history(history: List[Dict]) -> None:
-    """Save correction history"""
+    """Save correction history (and the running stats that summarize it)"""
     _CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    _CORRECTION_LOG.write_text(json.dumps(history, indent=2), encoding="utf-8")
+    write_json(_CORRECTION_LOG, history)
+    _save_correction_stats(_tally_corrections(history))
+
+
+def _tally_corrections(history: List[Dict]) -> Dict[str, int]:
+    actions = [h.get("action") for h in history]
+    return {
+        "total": len(actions),
+        "accepted": actions.count("accepted"),
+        "rejected": actions.count("rejected"),
+    }
+
+
+def _save_correction_stats(stats: Dict[str, int]) -> None:
+    """Persist stats with the log's (mtime_ns, size) so a log changed elsewhere is re-tallied."""
+    write_json(_CORRECTION_STATS, {"log": _stamp(_CORRECTION_LOG), **stats})
 
 
 def accept_ai_suggestion(track: str, tag: str) -> None:
@@ -301,15 +362,46 @@ def reject_ai_suggestion(track: str, tag: str, reason: str | None = None) -> Non
 
 
 def bulk_accept_suggestions(track_tags: Dict[str, List[str]]) -> int:
-    """Accept multiple suggestions at once. Returns count accepted."""
+    """Accept multiple suggestions at once. Returns count accepted.
+
+    Same effect as accept_ai_suggestion per (track, tag), but every file is
+    read and written once for the whole batch.
+    """
+    suggestions = load_ai_suggestions()
+    user_tags = load_user_tags()
+    history = load_correction_history()
+    accepted: Dict[str, List[str]] = {}
     count = 0
     for track, tags in track_tags.items():
         for tag in tags:
-            try:
-                accept_ai_suggestion(track, tag)
-                count += 1
-            except ValueError:
-                pass  # Suggestion doesn't exist, skip
+            if track not in suggestions or tag not in suggestions[track]:
+                continue  # Suggestion doesn't exist, skip
+            history.append(
+                {
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "track": track,
+                    "action": "accepted",
+                    "tag": tag,
+                    "confidence": suggestions[track][tag],
+                }
+            )
+            track_tags_set = set(user_tags.get(track, []))
+            track_tags_set.add(tag)
+            user_tags[track] = accepted[track] = sorted(track_tags_set)
+            del suggestions[track][tag]
+            if not suggestions[track]:
+                del suggestions[track]
+            count += 1
+    if not count:
+        return 0
+
+    save_correction_history(history)
+    save_user_tags(user_tags)
+    meta = load_meta()
+    for track, tags in accepted.items():
+        meta["tracks"].setdefault(track, {})["mytags"] = tags
+    save_meta(meta)
+    save_ai_suggestions(suggestions)
     return count
 
 
@@ -336,20 +428,42 @@ def get_all_tags(track: str) -> Dict[str, str]:
     return result
 
 
+def user_tag_index() -> Dict[str, List[str]]:
+    """Inverted user-tag index {tag: [tracks...]}, rebuilt only when my_tags.yml changes"""
+    if not _USER_TAGS.exists():
+        return {}
+    index = _cached_load(_USER_TAGS, _build_tag_index, view="index")
+    return {tag: list(tracks) for tag, tracks in index.items()}
+
+
+def _build_tag_index() -> Dict[str, List[str]]:
+    index: Dict[str, List[str]] = {}
+    for track, track_tags in _cached_load(_USER_TAGS, _parse_user_tags).items():
+        for tag in track_tags:
+            index.setdefault(tag, []).append(track)
+    return index
+
+
 def get_all_user_tags() -> Set[str]:
     """Get set of all unique user tags across library"""
-    tags = load_user_tags()
-    return set(tag for track_tags in tags.values() for tag in track_tags)
+    if not _USER_TAGS.exists():
+        return set()
+    return set(_cached_load(_USER_TAGS, _build_tag_index, view="index"))
 
 
 def get_correction_stats() -> Dict[str, int]:
-    """Get statistics on user corrections"""
-    history = load_correction_history()
-    return {
-        "total": len(history),
-        "accepted": sum(1 for h in history if h["action"] == "accepted"),
-        "rejected": sum(1 for h in history if h["action"] == "rejected"),
-    }
+    """Get statistics on user corrections (without re-reading the whole log when unchanged)"""
+    try:
+        saved = read_json(_CORRECTION_STATS)
+        log = saved.pop("log")
+        if log is not None and tuple(log) == _stamp(_CORRECTION_LOG):
+            return saved
+    except Exception:
+        pass
+    stats = _tally_corrections(load_correction_history())
+    if _CORRECTION_LOG.exists():
+        _save_correction_stats(stats)
+    return stats
 
 
 def get_suggestion_stats() -> Dict[str, int]:
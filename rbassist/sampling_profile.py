@@ -1,22 +1,39 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import tempfile
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import numpy as np
 import yaml
 
-try:
-    from scipy.signal import find_peaks
-except Exception:
-    find_peaks = None  # type: ignore
+from .utils import DATA
 
 try:
     import librosa
 except Exception:
     librosa = None
 
+try:
+    import soundfile as sf
+    import soxr
+except Exception:
+    sf = None  # type: ignore
+    soxr = None  # type: ignore
+
+
+def _find_peaks():
+    """_peaks.find_peaks, imported on first use (numba is slow to import); None without numba."""
+    try:
+        from ._peaks import find_peaks
+    except Exception:
+        return None
+    return find_peaks
+
 
 @dataclass
 class SamplingParams:
@@ -30,15 +47,50 @@ class SamplingParams:
     energy_onset_align: bool = True
 
 
+@lru_cache(maxsize=4)
+def _mel_basis(sr: int, n_fft: int):
+    """librosa's default 128-band mel filterbank as CSR; each FFT bin feeds at most two bands."""
+    from scipy.sparse import csr_matrix
+
+    return csr_matrix(librosa.filters.mel(sr=sr, n_fft=n_fft).astype(np.float32))
+
+
+def _onset_strength(y: np.ndarray, sr: int, hop: int, n_fft: int = 2048) -> np.ndarray:
+    """librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop) on numpy/pocketfft.
+
+    Same defaults (centered zero-padded Hann frames, 128-band mel power in dB
+    with an 80 dB floor, lag-1 positive flux averaged over bands, shifted to
+    frame centres) without librosa's per-call setup; the mel basis is cached
+    and sparse, which makes the filterbank product about 4x cheaper.
+    """
+    from scipy.fft import rfft
+
+    y = np.asarray(y, dtype=np.float32)
+    half = n_fft // 2
+    y_pad = np.pad(y, half)
+    frames = np.lib.stride_tricks.sliding_window_view(y_pad, n_fft)[::hop]
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+    spec = rfft(frames * window, axis=1, workers=-1)
+    power = spec.real**2 + spec.imag**2
+    mel_db = 10.0 * np.log10(np.maximum(1e-10, _mel_basis(sr, n_fft) @ power.T))
+    np.maximum(mel_db, mel_db.max() - 80.0, out=mel_db)
+    flux = np.maximum(0.0, mel_db[:, 1:] - mel_db[:, :-1]).mean(axis=0)
+    onset = np.zeros(mel_db.shape[1], dtype=flux.dtype)
+    pad = 1 + n_fft // (2 * hop)
+    onset[pad:] = flux[: max(0, onset.shape[0] - pad)]
+    return onset
+
+
 def _feature_curves(y: np.ndarray, sr: int, frame: int = 4096, hop: int = 1024):
     if librosa is None:
         raise RuntimeError("librosa required for sampling features")
-    onset = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop)
-    times = librosa.times_like(onset, sr=sr, hop_length=hop)
+    onset = _onset_strength(y, sr, hop)
+    times = np.arange(onset.shape[0]) * (hop / sr)
     return times, onset
 
 
 def _pick_main_start(times: np.ndarray, onset: np.ndarray, duration_s: float, p: SamplingParams) -> float:
+    find_peaks = _find_peaks()
     if librosa is None or not p.energy_onset_align or find_peaks is None:
         return min(p.start_skip_s, max(0.0, duration_s - 5.0))
     x = (onset - onset.min()) / (onset.ptp() + 1e-9)
@@ -53,9 +105,27 @@ def _pick_main_start(times: np.ndarray, onset: np.ndarray, duration_s: float, p:
     return float(t_sel[idx])
 
 
+def _select_min_gap(starts: np.ndarray, min_gap: float, n_keep: int) -> np.ndarray:
+    """Greedy pick, in order, of up to n_keep starts at least min_gap from every earlier pick.
+
+    Each candidate is checked against the picks so far in one array op; the
+    scan stops once n_keep are chosen.
+    """
+    picked = np.empty(n_keep, dtype=float)
+    k = 0
+    for t0 in starts:
+        if k >= n_keep:
+            break
+        if k == 0 or np.abs(t0 - picked[:k]).min() >= min_gap:
+            picked[k] = t0
+            k += 1
+    return picked[:k]
+
+
 def _pick_tails(times: np.ndarray, onset: np.ndarray, duration_s: float, p: SamplingParams):
+    find_peaks = _find_peaks()
     if find_peaks is None:
-        raise RuntimeError("scipy required for sampling features")
+        raise RuntimeError("numba required for sampling features")
     start_t = duration_s * p.tail_region
     mask = times >= start_t
     t_sel = times[mask]
@@ -64,16 +134,11 @@ def _pick_tails(times: np.ndarray, onset: np.ndarray, duration_s: float, p: Samp
     step = np.median(np.diff(t_sel)) if len(t_sel) > 1 else 0.1
     dist = max(1, int(p.min_gap_s / step))
     peaks, props = find_peaks(x, height=np.percentile(x, 60), distance=dist)
-    ts = list(t_sel[peaks])
-    hs = list(props.get("peak_heights", []))
-    order = np.argsort(hs)[::-1]
-    out = []
-    for i in order:
-        t0 = float(min(ts[i], duration_s - p.tail_len_s - 1.0))
-        if all(abs(t0 - s) >= p.min_gap_s for s, _ in out):
-            out.append((t0, t0 + p.tail_len_s))
-        if len(out) >= p.n_tail:
-            break
+    order = np.argsort(props.get("peak_heights", np.empty(0)))[::-1]
+    starts = np.minimum(t_sel[peaks][order], duration_s - p.tail_len_s - 1.0)
+    # the strongest tail is always kept, even with n_tail=0
+    picked = _select_min_gap(starts, p.min_gap_s, max(1, p.n_tail))
+    out = [(float(t0), float(t0) + p.tail_len_s) for t0 in picked]
     if p.force_tail_in_last_60s and duration_s > 90 and out:
         need = all(t0 < duration_s - 60 for t0, _ in out)
         if need:
@@ -82,12 +147,162 @@ def _pick_tails(times: np.ndarray, onset: np.ndarray, duration_s: float, p: Samp
     return out
 
 
+ANALYSIS_SR = 11025
+
+
+def _load_analysis_audio(audio_path: str, block_s: float = 10.0) -> np.ndarray | None:
+    """Mono float32 audio at ANALYSIS_SR, decoded and resampled block by block.
+
+    libsndfile blocks are downmixed and fed through one soxr stream into a
+    buffer sized from the file's frame count, so the native-rate track is
+    never held whole. None when soundfile/soxr are missing or libsndfile
+    cannot read the format.
+    """
+    if sf is None or soxr is None:
+        return None
+    try:
+        with sf.SoundFile(audio_path) as f:
+            sr_in = f.samplerate
+            out = np.empty(int(np.ceil(f.frames * ANALYSIS_SR / sr_in)) + 1, dtype=np.float32)
+            stream = soxr.ResampleStream(sr_in, ANALYSIS_SR, 1, dtype="float32", quality="HQ")
+            mono = np.empty(max(1, int(block_s * sr_in)), dtype=np.float32)
+            n = 0
+            for block in f.blocks(blocksize=mono.shape[0], dtype="float32", always_2d=True):
+                chunk = block.mean(axis=1, out=mono[: block.shape[0]])
+                res = stream.resample_chunk(chunk, last=False)
+                out[n : n + res.shape[0]] = res
+                n += res.shape[0]
+            res = stream.resample_chunk(np.empty(0, dtype=np.float32), last=True)
+            out[n : n + res.shape[0]] = res
+            n += res.shape[0]
+    except (sf.LibsndfileError, RuntimeError):
+        return None
+    return out[:n]
+
+
+def _to_analysis_rate(y: np.ndarray, sr: int) -> np.ndarray:
+    """y resampled to ANALYSIS_SR; same samples as librosa.resample's default soxr_hq."""
+    if sr == ANALYSIS_SR:
+        return y
+    if soxr is None:
+        return librosa.resample(y, orig_sr=sr, target_sr=ANALYSIS_SR)
+    out = soxr.resample(y, sr, ANALYSIS_SR, quality="HQ")
+    return librosa.util.fix_length(out, size=int(np.ceil(len(y) * ANALYSIS_SR / sr)))
+
+
+ONSET_CACHE = DATA / "cache" / "onset"
+# Least recently used entries are dropped once the cache passes this size
+# (an entry is ~10 KB per minute of audio).
+ONSET_CACHE_MAX_BYTES = 256 << 20
+_ONSET_HOP = 1024
+_PRUNE_EVERY = 64
+_stores = 0
+
+
+def _onset_cache_path(audio_path: str) -> Path | None:
+    """Cache file for a track's onset curve, keyed on its path, size and mtime."""
+    try:
+        st = os.stat(audio_path)
+    except OSError:
+        return None
+    raw = f"{Path(audio_path).resolve()}:{st.st_size}:{st.st_mtime_ns}:{ANALYSIS_SR}"
+    return ONSET_CACHE / f"{hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()}.npz"
+
+
+def _read_cached_curves(cache: Path | None) -> tuple[np.ndarray, np.ndarray, float] | None:
+    if cache is None or not cache.exists():
+        return None
+    try:
+        with np.load(cache) as z:
+            onset, duration_s = z["onset"], float(z["duration_s"])
+        os.utime(cache)  # mtime doubles as last use for pruning
+    except Exception:
+        return None  # unreadable entry: recompute and overwrite it
+    return np.arange(onset.shape[0]) * (_ONSET_HOP / ANALYSIS_SR), onset, duration_s
+
+
+def _store_curves(cache: Path, onset: np.ndarray, duration_s: float) -> None:
+    """Write an entry through a uniquely named temp file (decode workers share the directory)."""
+    global _stores
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache.parent, suffix=".tmp", delete=False) as f:
+            np.savez(f, onset=onset, duration_s=duration_s)
+        os.replace(f.name, cache)
+    except OSError:
+        return
+    _stores += 1
+    if _stores % _PRUNE_EVERY == 1:
+        _prune_onset_cache(cache.parent)
+
+
+def _prune_onset_cache(folder: Path, max_bytes: int | None = None) -> None:
+    """Delete the least recently used entries until the folder fits in max_bytes."""
+    limit = ONSET_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for path in folder.glob("*.npz"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime_ns, st.st_size, path))
+    entries.sort(reverse=True)
+    total = 0
+    for _mtime, size, path in entries:
+        total += size
+        if total > limit:
+            path.unlink(missing_ok=True)
+
+
+def _onset_curves(audio_path: str | None, load_analysis_audio) -> tuple[np.ndarray, np.ndarray, float]:
+    """(times, onset, duration_s), from the on-disk cache while `audio_path` is unchanged.
+
+    On a miss `load_analysis_audio()` supplies mono audio at ANALYSIS_SR and
+    the curves computed from it are stored for next time.
+    """
+    cache = _onset_cache_path(audio_path) if audio_path else None
+    hit = _read_cached_curves(cache)
+    if hit is not None:
+        return hit
+    y = load_analysis_audio()
+    duration_s = len(y) / ANALYSIS_SR
+    times, onset = _feature_curves(y, ANALYSIS_SR, hop=_ONSET_HOP)
+    if cache is not None:
+        _store_curves(cache, onset, duration_s)
+    return times, onset, duration_s
+
+
+def _decode_for_analysis(audio_path: str) -> np.ndarray:
+    y = _load_analysis_audio(audio_path)
+    if y is None:
+        y, _ = librosa.load(audio_path, sr=ANALYSIS_SR, mono=True)
+    return y
+
+
 def pick_windows(audio_path: str, params: SamplingParams) -> list[tuple[float, float]]:
     if librosa is None:
         raise RuntimeError("librosa required for sampling features")
-    y, sr = librosa.load(audio_path, sr=11025, mono=True)
-    duration_s = len(y) / sr
-    times, onset = _feature_curves(y, sr)
+    times, onset, duration_s = _onset_curves(audio_path, lambda: _decode_for_analysis(audio_path))
+    return _windows_from_curves(times, onset, duration_s, params)
+
+
+def pick_windows_from_array(
+    y: np.ndarray, sr: int, params: SamplingParams, audio_path: str | None = None
+) -> list[tuple[float, float]]:
+    """pick_windows for mono audio that is already decoded (avoids a second decode).
+
+    With `audio_path` the onset curves come from (and go to) the same on-disk
+    cache pick_windows uses, so an unchanged file skips the resample and STFT.
+    """
+    if librosa is None:
+        raise RuntimeError("librosa required for sampling features")
+    times, onset, duration_s = _onset_curves(audio_path, lambda: _to_analysis_rate(y, sr))
+    return _windows_from_curves(times, onset, duration_s, params)
+
+
+def _windows_from_curves(
+    times: np.ndarray, onset: np.ndarray, duration_s: float, params: SamplingParams
+) -> list[tuple[float, float]]:
     s0 = _pick_main_start(times, onset, duration_s, params)
     e0 = min(s0 + params.main_len_s, max(0.0, duration_s - 5.0))
     tails = _pick_tails(times, onset, duration_s, params)
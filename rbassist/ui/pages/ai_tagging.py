@@ -239,6 +239,7 @@ def _render_learning_panel() -> None:
 
                 # Store in AI suggestions namespace
                 suggestion_count = 0
+                to_store: dict[str, dict[str, float]] = {}
                 for track, tag_list in suggestions.items():
                     track_suggestions = {tag: score for tag, score, _ in tag_list}
 
@@ -253,9 +254,10 @@ def _render_learning_panel() -> None:
                     }
 
                     if filtered:
-                        for tag, conf in filtered.items():
-                            safe_tagstore.add_ai_suggestion(track, tag, conf)
+                        to_store[track] = filtered
                         suggestion_count += 1
+                # one read/write of the suggestions file for the whole batch
+                safe_tagstore.bulk_add_ai_suggestions(to_store)
 
                 ui.notify(
                     f"Generated {suggestion_count} AI suggestions! Review them below.",
@@ -11,6 +11,7 @@ from nicegui import ui
 
 from rbassist.cues import propose_cues
 from rbassist.analyze import _estimate_tempo  # reuse tempo estimator
+from rbassist.features import FeatureCache
 from rbassist.utils import load_meta, save_meta, console, walk_audio
 from ..state import get_state
 
@@ -26,8 +27,9 @@ def _generate_cues_for_file(path: str, duration_s: int, overwrite: bool) -> tupl
         y, sr = librosa.load(path, sr=None, mono=True, duration=duration_s if duration_s > 0 else None)
         if y.size == 0 or sr is None or sr <= 0:
             return False, "Empty audio"
-        bpm = _estimate_tempo(y, sr)
-        cues = propose_cues(y, sr, bpm=float(bpm))
+        cache = FeatureCache(y, sr)
+        bpm = _estimate_tempo(y, sr, cache)
+        cues = propose_cues(y, sr, bpm=float(bpm), cache=cache)
         info["bpm"] = float(bpm)
         info["cues"] = cues
         save_meta(meta)
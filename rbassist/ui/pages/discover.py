@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import numpy as np
 from nicegui import ui
 
 from ..state import get_state
@@ -174,10 +173,8 @@ class DiscoverPage:
 
     def _get_recommendations(self, seed_path: str, top: int = 50) -> list[dict]:
         """Get recommendations for seed track with weighted scoring."""
-        from rbassist.recommend import load_embedding_safe, IDX
+        from rbassist.recommend import _contour, _embedding_shard, _l2_normalize, _query_ef, _track_vector, get_index, load_paths_map
         from rbassist.utils import camelot_relation, tempo_match
-        import hnswlib
-        import json
 
         try:
             from rbassist.features import bass_similarity, rhythm_similarity
@@ -189,25 +186,22 @@ class DiscoverPage:
         tracks = meta.get("tracks", {})
         seed_info = tracks.get(seed_path, {})
 
-        # Load seed embedding
-        emb_path = seed_info.get("embedding")
-        if not emb_path:
+        # Load seed embedding (its shard row, else its .npy)
+        if not seed_info.get("embedding") and seed_info.get("embedding_row") is None:
             raise ValueError("Seed track has no embedding")
 
-        seed_vec = load_embedding_safe(emb_path)
+        seed_vec = _track_vector(seed_info, _embedding_shard(meta), None)
         if seed_vec is None:
             raise ValueError("Could not load seed embedding")
 
         # Load index
-        paths_file = IDX / "paths.json"
-        paths_map = json.loads(paths_file.read_text(encoding="utf-8"))
+        paths_map = load_paths_map()
 
-        index = hnswlib.Index(space="cosine", dim=seed_vec.shape[0])
-        index.load_index(str(IDX / "hnsw.idx"))
-        index.set_ef(64)
+        index = get_index(seed_vec.shape[0])
+        index.set_ef(_query_ef(top * 4))
 
         # Query - get more candidates for scoring
-        labels, dists = index.knn_query(seed_vec, k=min(top * 4, len(paths_map)))
+        labels, dists = index.knn_query(_l2_normalize(seed_vec), k=min(top * 4, len(paths_map)))
         labels, dists = labels[0].tolist(), dists[0].tolist()
 
         # Extract seed features
@@ -217,18 +211,11 @@ class DiscoverPage:
         seed_bpm = float(seed_info.get("bpm") or 0.0)
         seed_key = str(seed_info.get("key") or "")
         seed_camelot = str(seed_info.get("camelot") or "")
-        seed_features = seed_info.get("features", {})
         seed_tags = set(seed_info.get("tags", []) + seed_info.get("mytags", []))
 
         # Load seed contours
-        seed_bass_contour = np.array(
-            seed_features.get("bass_contour", {}).get("contour", []),
-            dtype=float,
-        )
-        seed_rhythm_contour = np.array(
-            seed_features.get("rhythm_contour", {}).get("contour", []),
-            dtype=float,
-        )
+        seed_bass_contour = _contour(seed_info, "bass")
+        seed_rhythm_contour = _contour(seed_info, "rhythm")
 
         # Hard filter settings
         bpm_max_diff = float(filters.get("bpm_max_diff", 0.0))
@@ -317,20 +304,14 @@ class DiscoverPage:
 
             # Bass similarity
             if weights.get("bass", 0.0) and bass_similarity is not None:
-                cand_bass_contour = np.array(
-                    cand_features.get("bass_contour", {}).get("contour", []),
-                    dtype=float,
-                )
+                cand_bass_contour = _contour(info, "bass")
                 if seed_bass_contour.size and cand_bass_contour.size:
                     bass_score = float(bass_similarity(seed_bass_contour, cand_bass_contour))
                     score += weights["bass"] * bass_score
 
             # Rhythm similarity
             if weights.get("rhythm", 0.0) and rhythm_similarity is not None:
-                cand_rhythm_contour = np.array(
-                    cand_features.get("rhythm_contour", {}).get("contour", []),
-                    dtype=float,
-                )
+                cand_rhythm_contour = _contour(info, "rhythm")
                 if seed_rhythm_contour.size and cand_rhythm_contour.size:
                     rhythm_score = float(rhythm_similarity(seed_rhythm_contour, cand_rhythm_contour))
                     score += weights["rhythm"] * rhythm_score
@@ -108,10 +108,12 @@ class AppState:
 
     def get_indexed_paths(self) -> list[str]:
         """Return list of indexed track paths."""
-        paths_file = IDX / "paths.json"
-        if paths_file.exists():
-            return json.loads(paths_file.read_text(encoding="utf-8"))
-        return []
+        from rbassist.recommend import load_paths_map
+
+        try:
+            return load_paths_map(IDX)
+        except FileNotFoundError:
+            return []
 
     def has_index(self) -> bool:
         """Check if HNSW index exists."""
@@ -1,9 +1,8 @@
 from __future__ import annotations
-import os, json, math, pathlib
+import os, json, math, pathlib, functools
 from typing import Iterable
 from datetime import datetime
 from rich.console import Console
-import torch
 
 console = Console()
 ROOT = pathlib.Path(__file__).resolve().parents[1]
@@ -89,6 +88,8 @@ def pick_device(user_choice: str | None = None) -> str:
     choice = (user_choice or "cuda").lower()
     if choice == "cpu":
         return "cpu"
+    import torch  # deferred: importing torch dominates CLI start-up
+
     if choice in {"cuda", "rocm"}:
         if torch.cuda.is_available():
             return "cuda"
@@ -176,6 +177,21 @@ def camelot_relation(seed: str | None, cand: str | None) -> tuple[bool, str]:
     return False, "-"
 
 
+def camelot_code(k: str | None) -> int:
+    """Index 0..23 of a Camelot key (1A, 1B, 2A, ...), or -1 if it does not parse."""
+    p = _parse_camelot(k)
+    if not p:
+        return -1
+    return (p[0] - 1) * 2 + (p[1] == "B")
+
+
+@functools.lru_cache(maxsize=1)
+def camelot_table() -> tuple[tuple[tuple[bool, str], ...], ...]:
+    """camelot_relation for every (seed, cand) pair of camelot_code indices."""
+    names = [f"{n}{l}" for n in range(1, 13) for l in "AB"]
+    return tuple(tuple(camelot_relation(s, c) for c in names) for s in names)
+
+
 def camelot_compat(k1: str | None, k2: str | None) -> bool:
     ok, _ = camelot_relation(k1, k2)
     return ok
@@ -191,6 +207,10 @@ def tempo_match(bpm1: float | None, bpm2: float | None, pct: float = 6.0, allow_
     return False
 import hashlib
 from pathlib import Path
+try:
+    import blake3  # type: ignore
+except Exception:
+    blake3 = None  # type: ignore
 
 def file_sig(path: str, chunk_size: int = 8192) -> str:
     """
@@ -216,6 +236,19 @@ def file_sig_fast(path: str) -> str:
     return f"{st.st_mtime_ns}_{st.st_size}"
 
 
+def file_sig_head(path: str, head_bytes: int = 1 << 20) -> str:
+    """
+    Content fingerprint from the first `head_bytes` of the file plus its size.
+    Unlike `file_sig_fast` it survives renames and copies, but it reads only ~1 MB, so it is
+    cheap enough to run before expensive per-track work (e.g., skipping re-embedding of
+    duplicates). Uses BLAKE3 when installed, otherwise BLAKE2b from the standard library.
+    """
+    h = blake3.blake3() if blake3 is not None else hashlib.blake2b(digest_size=32)
+    with open(Path(path), "rb") as f:
+        h.update(f.read(head_bytes))
+    return f"{h.hexdigest()}:{os.path.getsize(path)}"
+
+
 def current_file_sig(path: str) -> str:
     """
     Central hook for file signature strategy.
@@ -0,0 +1,61 @@
+import unittest
+from unittest import mock
+
+import librosa
+import numpy as np
+
+from rbassist._dtw import dtw_band
+from rbassist.features import bass_similarity, rhythm_similarity
+
+
+class DtwBandTests(unittest.TestCase):
+    def test_full_band_matches_librosa(self) -> None:
+        rng = np.random.default_rng(0)
+        a, b = rng.random(64), rng.random(80)
+        D, _ = librosa.sequence.dtw(a[None, :], b[None, :], metric="euclidean")
+        self.assertAlmostEqual(dtw_band(a, b, 80), float(D[-1, -1]), places=9)
+
+    def test_narrow_band_never_beats_full(self) -> None:
+        rng = np.random.default_rng(1)
+        a, b = rng.random(128), rng.random(128)
+        self.assertGreaterEqual(dtw_band(a, b, 4), dtw_band(a, b, 128))
+        # Radius 0 on equal lengths is the plain diagonal (L1 distance).
+        self.assertAlmostEqual(dtw_band(a, b, 0), float(np.abs(a - b).sum()), places=9)
+
+    def test_similarities_are_one_for_identical_contours(self) -> None:
+        c = np.linspace(40.0, 120.0, 300).astype(np.float32)
+        self.assertAlmostEqual(bass_similarity(c, c), 1.0)
+        r = np.abs(np.sin(np.linspace(0, 20, 256))).astype(np.float32)
+        self.assertAlmostEqual(rhythm_similarity(r, r), 1.0)
+        self.assertLess(rhythm_similarity(r, np.roll(r, 100) * 0.2), 1.0)
+
+    def test_batched_torch_matches_kernel(self) -> None:
+        import torch
+
+        from rbassist.features_gpu import dtw_band_batch
+
+        rng = np.random.default_rng(2)
+        a, B = rng.random(40), rng.random((3, 52))
+        got = dtw_band_batch(torch.tensor(a), torch.tensor(B), 5).numpy()
+        for k in range(3):
+            self.assertAlmostEqual(float(got[k]), dtw_band(a, B[k], 5), places=9)
+
+    def test_recommend_routes_large_pools_to_gpu(self) -> None:
+        import torch
+
+        from rbassist import features, recommend
+
+        seed = np.linspace(40.0, 120.0, 64).astype(np.float32)
+        cands = [seed + k for k in range(3)]
+        cpu = recommend._batch_similarity(len(cands))
+        self.assertIs(cpu, features.batch_similarity)
+        with mock.patch.object(recommend, "_accelerator", return_value=torch.device("cpu")):
+            with mock.patch.object(recommend, "GPU_MIN_CANDIDATES", 2):
+                gpu = recommend._batch_similarity(len(cands))
+            self.assertIs(recommend._batch_similarity(1), features.batch_similarity)
+        self.assertIsNot(gpu, features.batch_similarity)
+        np.testing.assert_allclose(gpu(seed, cands, "bass"), cpu(seed, cands, "bass"), atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import pathlib
+import tempfile
+import unittest
+
+import numpy as np
+
+from rbassist.embed import SHARD_ALIGN, EmbeddingShard
+
+
+class EmbeddingShardTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tmp.name) / "_embedding_mert_shard.npy"
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_rows_survive_growth_and_reopen(self) -> None:
+        shard = EmbeddingShard(self.path, dim=8)
+        vecs = [np.full(8, i, dtype=np.float32) for i in range(5)]
+        rows = [shard.write(None, v) for v in vecs]
+        self.assertEqual(rows, [0, 1, 2, 3, 4])
+        self.assertEqual(shard.write(2, np.full(8, 9.0)), 2)
+        shard.flush()
+
+        reopened = EmbeddingShard(self.path, dim=8, rows=shard.rows)
+        self.assertEqual(reopened.rows, 5)
+        self.assertEqual(float(reopened.read(4)[0]), 4.0)
+        self.assertEqual(float(reopened.read(2)[0]), 9.0)
+
+        mm = np.load(self.path, mmap_mode="r")
+        self.assertEqual(mm.dtype, np.float16)
+        self.assertEqual(mm.offset % SHARD_ALIGN, 0)
+        self.assertEqual(float(mm[1][0]), 1.0)
+
+    def test_width_change_starts_empty(self) -> None:
+        shard = EmbeddingShard(self.path, dim=8)
+        shard.write(None, np.ones(8))
+        shard.flush()
+        other = EmbeddingShard(self.path, dim=4, rows=1)
+        self.assertEqual(other.rows, 0)
+        self.assertEqual(other.write(None, np.ones(4)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import soundfile as sf
+
+from rbassist import sampling_profile as sp
+
+
+class OnsetCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        self.cache = root / "onset"
+        patcher = mock.patch.object(sp, "ONSET_CACHE", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        rng = np.random.default_rng(0)
+        self.sr = 22050
+        self.y = (rng.standard_normal(self.sr * 120) * 0.1).astype(np.float32)
+        self.audio = root / "t.wav"
+        sf.write(self.audio, self.y, self.sr)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_decoded_array_fills_cache_for_later_calls(self) -> None:
+        params = sp.SamplingParams()
+        first = sp.pick_windows_from_array(self.y, self.sr, params, str(self.audio))
+        self.assertEqual(len(list(self.cache.glob("*.npz"))), 1)
+        self.assertEqual(list(self.cache.glob("*.tmp")), [])
+        with mock.patch.object(sp, "_feature_curves", side_effect=AssertionError("cache miss")):
+            self.assertEqual(sp.pick_windows_from_array(self.y, self.sr, params, str(self.audio)), first)
+            self.assertEqual(sp.pick_windows(str(self.audio), params), first)
+
+    def test_prune_keeps_most_recent_entries(self) -> None:
+        self.cache.mkdir()
+        for i in range(6):
+            entry = self.cache / f"{i}.npz"
+            entry.write_bytes(b"x" * 100)
+            mtime = 1_000_000_000 + i
+            os.utime(entry, (mtime, mtime))
+        sp._prune_onset_cache(self.cache, max_bytes=250)
+        self.assertEqual(sorted(p.name for p in self.cache.glob("*.npz")), ["4.npz", "5.npz"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+from rbassist import recommend
+
+
+class PathsMapTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.idx = pathlib.Path(self.tmp.name)
+        patcher = mock.patch.object(recommend, "IDX", self.idx)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_round_trip_keeps_unusual_characters(self) -> None:
+        paths = ["/m/a.mp3", "/m/c\x85d.mp3", "/m/e\u2028f\u2029g.flac", '/m/"q"\\r\n.wav', "/m/caf\u00e9.mp3"]
+        recommend._write_paths_map(paths)
+        self.assertEqual(recommend.load_paths_map(self.idx), paths)
+
+    def test_append_adds_labels_in_order(self) -> None:
+        recommend._write_paths_map(["/m/a.mp3", "/m/b\x85.mp3"])
+        recommend._write_paths_map(["/m/c\u2028.mp3"], append=True)
+        self.assertEqual(recommend.load_paths_map(self.idx), ["/m/a.mp3", "/m/b\x85.mp3", "/m/c\u2028.mp3"])
+
+    def test_legacy_paths_json_is_read_and_replaced(self) -> None:
+        (self.idx / "paths.json").write_text('["/m/old.mp3"]', encoding="utf-8")
+        self.assertEqual(recommend.load_paths_map(self.idx), ["/m/old.mp3"])
+        recommend._write_paths_map(["/m/old.mp3", "/m/new.mp3"])
+        self.assertFalse((self.idx / "paths.json").exists())
+        self.assertEqual(recommend.load_paths_map(self.idx), ["/m/old.mp3", "/m/new.mp3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
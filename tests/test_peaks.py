@@ -0,0 +1,24 @@
+import unittest
+
+import numpy as np
+from scipy.signal import find_peaks as scipy_find_peaks
+
+from rbassist._peaks import find_peaks
+
+
+class FindPeaksTests(unittest.TestCase):
+    def test_matches_scipy(self) -> None:
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            # rounded values give plateaus and tied heights
+            x = np.round(rng.random(int(rng.integers(0, 400))) * 8) / 8
+            height = float(rng.random())
+            distance = int(rng.integers(1, 30))
+            ref, ref_props = scipy_find_peaks(x, height=height, distance=distance)
+            got, props = find_peaks(x, height=height, distance=distance)
+            np.testing.assert_array_equal(got, ref)
+            np.testing.assert_array_equal(props["peak_heights"], ref_props["peak_heights"])
+
+
+if __name__ == "__main__":
+    unittest.main()